@@ -0,0 +1,93 @@
+"""
+Authenticated principal cache.
+
+Keeps the users resolved by `get_current_user` in a bounded, per-process
+LRU with a TTL, so authenticated requests do not need a `select(User)`.
+Entries are evicted when a transaction that inserted, updated or deleted
+a user row through the ORM commits (evicting at flush would let a
+concurrent request cache the old row again); the TTL bounds staleness
+across workers.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .models import User
+from ..config import settings
+
+CACHED_FIELDS = ("id", "username", "role", "tenant_id")
+
+
+class PrincipalCache:
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Return a fresh, session-less `User` for `user_id`, or None."""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return User(**entry[1])
+
+    def set(self, user: User) -> None:
+        if self.maxsize <= 0:
+            return
+        values = {field: getattr(user, field) for field in CACHED_FIELDS}
+        self._entries[user.id] = (time.monotonic() + self.ttl, values)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        """Evict one user, or everyone when `user_id` is None."""
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_users(session) -> None:
+    for user_id in session.info.pop("changed_users", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_users(session) -> None:
+    session.info.pop("changed_users", None)
@@ -1,5 +1,5 @@
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,16 +7,15 @@ from sqlalchemy.future import select
 
 from ..db import get_session
 from ..config import settings
+from ..core.sharding import bind_tenant
 from .models import User
+from .cache import principal_cache
 from .security import ALGORITHM
 
 # This scheme assumes the client sends "Authorization: Bearer <token>"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_session)
-) -> User:
+async def get_user_from_token(token: str, db: AsyncSession) -> User:
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,11 +32,36 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
         
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+
     # Retrieve user from DB
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     
     if user is None:
         raise credentials_exception
-        
+
+    principal_cache.set(user)
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_session)
+) -> User:
+    user = await get_user_from_token(token, db)
+    # From here on the session uses the tenant's shard
+    await bind_tenant(db, user.tenant_id)
+    return user
+
+
+async def get_current_user_from_query(
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_session)
+) -> User:
+    """For EventSource clients, which cannot send an Authorization header."""
+    user = await get_user_from_token(token, db)
+    await bind_tenant(db, user.tenant_id)
     return user
@@ -5,9 +5,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from .models import User
-from .schemas import UserCreate, UserOut, Token
-from .security import get_password_hash, verify_password, create_access_token
-from ..db import get_session
+from .schemas import UserCreate, UserOut, Token, PrincipalCacheStats
+from .cache import principal_cache
+from .security import get_password_hash_async, verify_password_async, needs_rehash, create_access_token
+from ..core.sharding import bind_tenant
+from ..db import get_session, get_read_session
 
 router = APIRouter()
 
@@ -27,7 +29,7 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_session))
 
         user = User(
             username=user_in.username,
-            hashed_password=get_password_hash(user_in.password),
+            hashed_password=await get_password_hash_async(user_in.password),
             role="admin", # First user is always admin
             tenant_id=new_tenant_id
         )
@@ -45,11 +47,17 @@ async def login(user_in: UserCreate, db: AsyncSession = Depends(get_session)):
 
     result = await db.execute(select(User).where(User.username == user_in.username))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(user_in.password, user.hashed_password):
+    if not user or not await verify_password_async(user_in.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas",
         )
+    if needs_rehash(user.hashed_password):
+        # Cost factor changed since this hash was made: upgrade it now that we know the password.
+        # Bound to the tenant's shard so that its copy of the user gets the new hash too
+        await bind_tenant(db, user.tenant_id)
+        user.hashed_password = await get_password_hash_async(user_in.password)
+        await db.commit()
     access_token = create_access_token({"sub": str(user.id), "role": user.role, "tenant_id": user.tenant_id})
     return Token(access_token=access_token, role=user.role, tenant_id=user.tenant_id)
 
@@ -73,7 +81,7 @@ async def create_user(
 
     new_user = User(
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
         role=user_in.role, # Can be cashier or admin
         tenant_id=current_user.tenant_id # Inherit Tenant ID
     )
@@ -85,26 +93,40 @@ async def create_user(
 
 @router.get("/", response_model=list[UserOut])
 async def get_users(
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """List all users of the current tenant."""
     result = await db.execute(select(User).where(User.tenant_id == current_user.tenant_id))
     return result.scalars().all()
 
+@router.get("/cache/stats", response_model=PrincipalCacheStats)
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters of the authenticated user cache of this worker."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores")
+    return principal_cache.stats()
+
+
 from sqlalchemy import update
 from app.sales.models import Sale
 
 # ... (existing imports)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, db: AsyncSession = Depends(get_session)):
-    """Delete a user."""
+async def delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a user of the current tenant."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores pueden eliminar usuarios")
     user = await db.get(User, user_id)
-    if not user:
+    if not user or user.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    
-    # Unlink user from sales (set user_id = NULL)
+
+    # Unlink user from sales (set user_id = NULL), in the tenant's shard bound by get_current_user
     await db.execute(update(Sale).where(Sale.user_id == user_id).values(user_id=None))
     
     await db.delete(user)
@@ -54,3 +54,13 @@ class Token(BaseModel):
     token_type: str = "bearer"
     role: str
     tenant_id: str | None = None
+
+
+class PrincipalCacheStats(BaseModel):
+    """Counters of the authenticated user cache."""
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_rate: float
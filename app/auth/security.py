@@ -1,5 +1,8 @@
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import hashlib
@@ -11,6 +14,12 @@ import bcrypt
 
 ALGORITHM = "HS256"
 
+# bcrypt is CPU bound: run it on a small dedicated pool, never on the event loop.
+# Created on first use, so a new lifespan after shutdown_hash_executor() gets a fresh one.
+_hash_executor: ThreadPoolExecutor | None = None
+_pending_hashes = 0
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Pre-hash con SHA-256 (digest) + Base64 para reducir longitud
     password_bytes = plain_password.encode('utf-8')
@@ -27,9 +36,52 @@ def get_password_hash(password: str) -> str:
     password_hash_b64 = base64.b64encode(password_hash_bytes) # bcrypt expects bytes
     
     # Generar salt y hash
-    hashed = bcrypt.hashpw(password_hash_b64, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password_hash_b64, bcrypt.gensalt(rounds=settings.bcrypt_rounds))
     return hashed.decode('utf-8')
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with a cost other than `bcrypt_rounds`."""
+    # Format: $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed_password.split('$')[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt"
+        )
+    return _hash_executor
+
+async def _run_hash_job(func, *args):
+    global _pending_hashes
+    if _pending_hashes >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, inténtelo de nuevo",
+            headers={"Retry-After": "1"},
+        )
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hash_job(get_password_hash, password)
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
 def create_access_token(data: dict, expires_delta: int | None = None):
 
     to_encode = data.copy()
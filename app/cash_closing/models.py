@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, Float, ForeignKey, String
+from sqlalchemy import Column, Integer, Float, ForeignKey, String, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -29,4 +29,60 @@ class CashClosing(Base):
     total_sales = Column(Integer, default=0) # Count of sales
     total_cash = Column(Float, default=0.0)
     total_card = Column(Float, default=0.0)
-    total_total = Column(Float, default=0.0)
\ No newline at end of file
+    total_total = Column(Float, default=0.0)
+    totals_by_method = Column(JSON, nullable=True) # {payment_method: total}
+
+    __table_args__ = (
+        # Latest closing of a tenant
+        Index("ix_cash_closings_tenant_id_id", "tenant_id", "id"),
+    )
+
+
+class ArchivedSale(Base):
+    """Copy of a sale moved out of `sales` by a Z closing."""
+
+    __tablename__ = "sales_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False) # Original sales.id
+    closing_id = Column(Integer, ForeignKey("cash_closings.id"), nullable=False, index=True)
+    total = Column(Float, nullable=False, default=0.0)
+    payment_method = Column(String)
+    status = Column(String)
+    created_at = Column(Float)
+    user_id = Column(Integer, nullable=True)
+    closed_by_id = Column(Integer, nullable=True)
+    table_id = Column(Integer, nullable=True)
+    name = Column(String, nullable=True)
+    tenant_id = Column(String, nullable=False, index=True)
+
+
+class ArchivedSaleLine(Base):
+    """Copy of a sale line moved out of `sale_lines` by a Z closing."""
+
+    __tablename__ = "sale_lines_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False) # Original sale_lines.id
+    closing_id = Column(Integer, ForeignKey("cash_closings.id"), nullable=False, index=True)
+    sale_id = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price_unit = Column(Float, nullable=False)
+    line_total = Column(Float, nullable=False)
+
+
+class RunningTotal(Base):
+    """Settled sales since the tenant's last Z closing, per payment method."""
+
+    __tablename__ = "closing_running_totals"
+
+    tenant_id = Column(String, primary_key=True)
+    payment_method = Column(String, primary_key=True)
+
+    sales_count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+    # Watermarks: sale id and date ranges covered so far
+    from_sales = Column(Integer, nullable=True)
+    to_sales = Column(Integer, nullable=True)
+    from_date = Column(Float, nullable=True)
+    to_date = Column(Float, nullable=True)
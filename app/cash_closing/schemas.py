@@ -1,4 +1,6 @@
 
+from typing import Dict
+
 from pydantic import BaseModel
 
 # --------- INPUT (lo que envías al crear cierre) --------- #
@@ -19,6 +21,18 @@ class CashClosingCreate(BaseModel):
 
 # --------- OUTPUT (lo que responde la API) --------- #
 
+class CashClosingTotals(BaseModel):
+
+    from_date: float | None = None
+    to_date: float | None = None
+    from_sales: int | None = None
+    to_sales: int | None = None
+    total_sales: int = 0
+    total_cash: float = 0.0
+    total_card: float = 0.0
+    total_total: float = 0.0
+    totals_by_method: Dict[str, float] = {}
+
 class CashClosingOut(BaseModel):
 
     id: int
@@ -33,6 +47,7 @@ class CashClosingOut(BaseModel):
     total_cash: float
     total_card: float
     total_total: float
+    totals_by_method: Dict[str, float] | None = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,158 @@
+"""
+Cash closing service.
+
+Closings read the tenant's running totals: one row per payment method
+holding the count, total and id/date watermarks of the settled sales since
+the last Z closing. `record_sale` folds each sale into them in the
+transaction that closes it, so an X report is a read of a few rows instead
+of a scan of the day's sales. OPEN accounts and CANCELLED sales are left out.
+
+A Z closing then moves the sales it counted (settled with one of its payment
+methods, up to its last id) and the cancelled ones, with their lines, into
+the archive tables with set-based INSERT ... SELECT and DELETE statements,
+and resets the running totals it read, in the same transaction as the
+closing row. A sale settled meanwhile with a payment method the closing did
+not see keeps its running total and stays for the next period.
+"""
+from typing import List, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import case, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import CashClosing, ArchivedSale, ArchivedSaleLine, RunningTotal
+from .schemas import CashClosingTotals
+from ..sales.models import Sale, SaleLine
+from ..auth.models import User
+from ..db import dialect_insert
+
+EXCLUDED_STATUSES = ("OPEN", "CANCELLED")
+
+TOTAL_COLUMNS = (
+    RunningTotal.payment_method,
+    RunningTotal.from_sales,
+    RunningTotal.to_sales,
+    RunningTotal.from_date,
+    RunningTotal.to_date,
+    RunningTotal.sales_count,
+    RunningTotal.total,
+)
+
+
+async def record_sale(db: AsyncSession, sale: Sale) -> None:
+    """Fold a sale that was just settled into its tenant's running totals."""
+    stmt = dialect_insert(db)(RunningTotal).values(
+        tenant_id=sale.tenant_id,
+        payment_method=sale.payment_method or "cash",
+        sales_count=1,
+        total=sale.total,
+        from_sales=sale.id,
+        to_sales=sale.id,
+        from_date=sale.created_at,
+        to_date=sale.created_at,
+    )
+    new = stmt.excluded
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[RunningTotal.tenant_id, RunningTotal.payment_method],
+            set_={
+                "sales_count": RunningTotal.sales_count + 1,
+                "total": RunningTotal.total + new.total,
+                "from_sales": case((new.from_sales < RunningTotal.from_sales, new.from_sales), else_=RunningTotal.from_sales),
+                "to_sales": case((new.to_sales > RunningTotal.to_sales, new.to_sales), else_=RunningTotal.to_sales),
+                "from_date": case((new.from_date < RunningTotal.from_date, new.from_date), else_=RunningTotal.from_date),
+                "to_date": case((new.to_date > RunningTotal.to_date, new.to_date), else_=RunningTotal.to_date),
+            },
+        )
+    )
+
+
+async def running_totals(db: AsyncSession, tenant_id: str, lock: bool = False) -> List[Sequence]:
+    query = select(*TOTAL_COLUMNS).where(RunningTotal.tenant_id == tenant_id, RunningTotal.sales_count > 0)
+    if lock:
+        # Sales settled meanwhile wait and land in the next period
+        query = query.with_for_update()
+    result = await db.execute(query)
+    return result.all()
+
+
+def summarize(rows: List[Sequence]) -> CashClosingTotals:
+    totals_by_method = {method: total or 0.0 for method, _, _, _, _, _, total in rows}
+    return CashClosingTotals(
+        from_sales=min((row[1] for row in rows), default=None),
+        to_sales=max((row[2] for row in rows), default=None),
+        from_date=min((row[3] for row in rows), default=None),
+        to_date=max((row[4] for row in rows), default=None),
+        total_sales=sum(row[5] for row in rows),
+        total_cash=totals_by_method.get("cash", 0.0),
+        total_card=totals_by_method.get("card", 0.0),
+        total_total=sum(totals_by_method.values()),
+        totals_by_method=totals_by_method,
+    )
+
+
+async def current_totals(db: AsyncSession, tenant_id: str) -> CashClosingTotals:
+    """X report figures without saving a closing."""
+    return summarize(await running_totals(db, tenant_id))
+
+
+async def build_closing(db: AsyncSession, current_user: User, closing_type: str) -> CashClosing:
+    """Turn the tenant's running totals into an unsaved `CashClosing`."""
+    rows = await running_totals(db, current_user.tenant_id, lock=closing_type == "Z")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No hay ventas para cerrar")
+
+    return CashClosing(
+        closing_type=closing_type,
+        user_id=current_user.id,
+        tenant_id=current_user.tenant_id,
+        **summarize(rows).model_dump(),
+    )
+
+
+SALE_COLUMNS = (
+    "id", "total", "payment_method", "status", "created_at",
+    "user_id", "closed_by_id", "table_id", "name", "tenant_id",
+)
+LINE_COLUMNS = ("id", "sale_id", "product_id", "quantity", "price_unit", "line_total")
+
+
+async def archive_sales(db: AsyncSession, closing: CashClosing) -> None:
+    """
+    Move the sales covered by a flushed Z closing into the archive.
+
+    Runs a fixed number of statements regardless of volume and resets the
+    running totals the closing read; the caller commits. Rows are deleted
+    only if they were archived under this closing.
+    """
+    # The payment methods whose running totals build_closing read and locked
+    methods = list(closing.totals_by_method)
+    await db.execute(
+        insert(ArchivedSale).from_select(
+            ["closing_id", *SALE_COLUMNS],
+            select(closing.id, *(getattr(Sale, column) for column in SALE_COLUMNS)).where(
+                Sale.tenant_id == closing.tenant_id,
+                Sale.id <= closing.to_sales,
+                Sale.status != "OPEN", # Open accounts stay on their tables
+                or_(Sale.status == "CANCELLED", func.coalesce(Sale.payment_method, "cash").in_(methods)),
+            ),
+        )
+    )
+    archived_ids = select(ArchivedSale.id).where(ArchivedSale.closing_id == closing.id)
+    await db.execute(
+        insert(ArchivedSaleLine).from_select(
+            ["closing_id", *LINE_COLUMNS],
+            select(closing.id, *(getattr(SaleLine, column) for column in LINE_COLUMNS)).where(
+                SaleLine.sale_id.in_(archived_ids)
+            ),
+        )
+    )
+    await db.execute(
+        delete(SaleLine).where(SaleLine.sale_id.in_(archived_ids)).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(Sale).where(Sale.id.in_(archived_ids)).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(RunningTotal).where(RunningTotal.tenant_id == closing.tenant_id, RunningTotal.payment_method.in_(methods))
+    )
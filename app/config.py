@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,6 +8,30 @@ class Settings(BaseSettings):
     secret_key: str
     access_token_expire_minutes: int = 60
     database_url: str
+    database_read_url: str | None = None  # Read replica for the read-only endpoints (unset: all on the primary)
+    read_your_writes_seconds: float = 5.0  # After a write, that client reads from the primary this long
+    database_shards: Dict[str, str] = {}  # Extra databases for isolated tenants, name -> URL (JSON); see app/core/sharding.py
+    shard_directory_ttl_seconds: float = 30.0  # How long workers cache a tenant's shard; moves wait this long
+    db_pool_size: int = 5  # Connections kept open per worker
+    db_max_overflow: int = 10  # Extra connections allowed above the pool size under load
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection before failing
+    db_pool_recycle: int = -1  # Reopen connections older than this many seconds (-1 never)
+    db_pool_pre_ping: bool = False  # Test connections on checkout (survives DB restarts)
+    db_statement_cache_size: int = 100  # asyncpg prepared statements per connection (0 behind PgBouncer)
+    migrate_on_startup: bool = False  # Apply pending schema migrations at boot instead of only checking
+    events_backend: str = "memory"  # memory / postgres (LISTEN/NOTIFY, for several workers)
+    user_cache_size: int = 1024  # Authenticated users kept in memory per worker (0 disables)
+    user_cache_ttl_seconds: float = 60.0
+    bcrypt_rounds: int = 12  # Cost factor; existing hashes are upgraded on login
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64  # Hash jobs queued or running before answering 503
+    catalog_cache_ttl_seconds: float = 30.0  # Bounds staleness of catalog snapshots across workers
+    catalog_cache_max_tenants: int = 1000
+    product_index_ttl_seconds: float = 300.0  # Rebuild period of the in-memory product search index
+    product_index_max_tenants: int = 1000  # Tenants whose search index is kept per worker (least recently used dropped)
+    report_timezone: str = "UTC"  # Day/hour boundaries of the sales rollups, e.g. Europe/Madrid
+    analytics_cache_size: int = 128  # Analytics results kept per worker
+    export_dir: str = "exports"  # Output of the columnar (Parquet) history export
 
     # Configuración para leer el .env
     model_config = SettingsConfigDict(
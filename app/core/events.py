@@ -0,0 +1,152 @@
+"""
+Per-tenant event channel.
+
+Routes publish small JSON events (an account was opened, its lines changed,
+it was closed or cancelled) and connected terminals receive them instead of
+re-downloading the whole active board. The in-process broker is enough for a
+single worker; `PostgresBroker` relays events between workers through
+LISTEN/NOTIFY.
+
+Events are published after the write committed, so `publish` never raises:
+a lost event is logged, and terminals catch up on their next reload.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set
+
+from sqlalchemy.engine import make_url
+
+from ..config import settings
+
+SUBSCRIBER_QUEUE_SIZE = 100
+SSE_KEEPALIVE_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+
+def changed_event(event: dict) -> dict:
+    """Small stand-in for an event too big to relay: clients refetch the sale."""
+    if "sale" in event:
+        return {"type": "sale_changed", "id": event["sale"]["id"]}
+    return {"type": "resync"}
+
+
+class EventBroker:
+    """
+    Base broker: fans published events out to the local subscribers.
+
+    Backends only decide how an event reaches `_dispatch` on every worker.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, tenant_id: str, event: dict) -> None:
+        """Deliver an event to the tenant's subscribers on every worker; never raises."""
+        try:
+            await self._publish(tenant_id, event)
+        except Exception:
+            logger.exception("Could not publish %s event for tenant %s", event.get("type"), tenant_id)
+
+    async def _publish(self, tenant_id: str, event: dict) -> None:
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def subscribe(self, tenant_id: str) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[tenant_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[tenant_id].discard(queue)
+            if not self._subscribers[tenant_id]:
+                del self._subscribers[tenant_id]
+
+    def _dispatch(self, tenant_id: str, event: dict) -> None:
+        for queue in self._subscribers.get(tenant_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and ask it to reload
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+
+class InMemoryBroker(EventBroker):
+    """Single-process broker."""
+
+    async def _publish(self, tenant_id: str, event: dict) -> None:
+        self._dispatch(tenant_id, event)
+
+
+class PostgresBroker(EventBroker):
+    """Relays events between workers with PostgreSQL LISTEN/NOTIFY."""
+
+    CHANNEL = "tpv_events"
+    # NOTIFY payloads must be shorter than 8000 bytes
+    MAX_PAYLOAD_BYTES = 7999
+
+    def __init__(self, database_url: str, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        super().__init__(queue_size)
+        # asyncpg wants a plain postgresql:// DSN, without the SQLAlchemy driver
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(self.CHANNEL, self._on_notify)
+
+    async def stop(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def _publish(self, tenant_id: str, event: dict) -> None:
+        payload = json.dumps({"tenant_id": tenant_id, "event": event})
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD_BYTES:
+            payload = json.dumps({"tenant_id": tenant_id, "event": changed_event(event)})
+        # asyncpg connections do not allow concurrent operations
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        message = json.loads(payload)
+        self._dispatch(message["tenant_id"], message["event"])
+
+
+async def sse_stream(tenant_id: str) -> AsyncIterator[str]:
+    """Server-sent events for a tenant, with keep-alive comments."""
+    async with broker.subscribe(tenant_id) as queue:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def create_broker() -> EventBroker:
+    if settings.events_backend == "postgres":
+        return PostgresBroker(settings.database_url)
+    if settings.events_backend == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unknown events backend: {settings.events_backend}")
+
+
+broker = create_broker()
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Float, String
+
+from ..db import Base
+
+
+class TenantShard(Base):
+    """Directory entry: the shard holding a tenant's data (absent: the main database)."""
+
+    __tablename__ = "tenant_shards"
+
+    tenant_id = Column(String, primary_key=True)
+    shard = Column(String, nullable=False) # Name in settings.database_shards, or "default"
+    moving = Column(Boolean, nullable=False, default=False) # Requests are refused while its rows are copied
+    updated_at = Column(Float, default=lambda: datetime.now().timestamp())
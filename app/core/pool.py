@@ -0,0 +1,69 @@
+"""
+Database connection pool instrumentation.
+
+`InstrumentedPool` is the engine's queue pool with counters around
+checkouts: how many, how long callers waited for a connection (including
+opening or pre-pinging it) and how many gave up after `pool_timeout`.
+Combined with the pool's own size/overflow gauges they explain pool
+exhaustion under load. Figures are per worker.
+"""
+import time
+from collections import deque
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=WAIT_SAMPLES)  # Most recent wait times, in seconds
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.waits.append(wait)
+
+    def snapshot(self, pool) -> Dict[str, float]:
+        recent = sorted(self.waits)
+        p95 = recent[int(len(recent) * 0.95) - 1] if len(recent) > 1 else (recent[0] if recent else 0.0)
+        status = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        } if isinstance(pool, AsyncAdaptedQueuePool) else {}
+        return {
+            **status,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_p95_ms": p95 * 1000,
+            "wait_max_ms": self.wait_max * 1000,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.record(time.perf_counter() - start)
+        return connection
@@ -0,0 +1,46 @@
+"""
+Read-your-writes for the read replica.
+
+Read-only endpoints use `get_read_session`, which reads from the replica
+(`settings.database_read_url`). A client that has just written would not
+see its own change there until replication catches up, so every successful
+write request (POST/PUT/PATCH/DELETE) sets a short-lived cookie and, while
+it lasts (`settings.read_your_writes_seconds`), that client's reads go to
+the primary. The cookie travels with the client, so this holds whichever
+worker serves the next request.
+
+Locally, two SQLite files (or two Postgres databases) stand in for primary
+and replica; run the migrations against each:
+
+    python -m app.migrations upgrade
+    DATABASE_URL=sqlite+aiosqlite:///./replica.db python -m app.migrations upgrade
+    DATABASE_READ_URL=sqlite+aiosqlite:///./replica.db uvicorn app.main:app
+"""
+import math
+
+from ..config import settings
+
+PRIMARY_COOKIE = "tpv_read_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware:
+    """Pins the client to the primary for a few seconds after a successful write."""
+
+    def __init__(self, app, seconds: float = settings.read_your_writes_seconds):
+        self.app = app
+        self.cookie = (
+            f"{PRIMARY_COOKIE}=1; Max-Age={max(math.ceil(seconds), 1)}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
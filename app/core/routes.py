@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from .pool import pool_metrics
+from .schemas import PoolStats
+from ..auth.dependencies import get_current_user
+from ..auth.models import User
+from ..db import engine
+
+router = APIRouter()
+
+
+@router.get("/db-pool", response_model=PoolStats)
+async def get_pool_stats(current_user: User = Depends(get_current_user)):
+    """Connection pool usage and wait times of this worker."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores")
+    return pool_metrics.snapshot(engine.pool)
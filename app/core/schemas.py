@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    """Connection pool gauges and checkout counters of this worker."""
+    size: int | None = None
+    checked_out: int | None = None
+    checked_in: int | None = None
+    overflow: int | None = None
+    max_overflow: int | None = None
+    timeout: float | None = None
+    checkouts: int
+    timeouts: int
+    wait_avg_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
@@ -1,13 +1,70 @@
 
+from fastapi import Depends, Request
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.util import find_tables
 from .config import settings
+from .core.pool import InstrumentedPool
+from .core.replica import PRIMARY_COOKIE
 
 DATABASE_URL = settings.database_url
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+
+def engine_options(url: str, poolclass=InstrumentedPool) -> dict:
+    """Pool and driver options from the settings (SQLite keeps its default pool)."""
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return {}
+    options = {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        }
+    return options
+
+
+# Tables that stay in the main database when tenants are sharded (app/core/sharding.py)
+GLOBAL_TABLES = {"users", "tenant_shards", "schema_version"}
+
+
+class RoutingSession(Session):
+    """Sends tenant tables to the shard in `info["route"]`, once `bind_tenant` has set it."""
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        shard = self.info.get("route", {}).get("engine")
+        if shard is not None:
+            tables = {table.name for table in find_tables(clause, include_crud=True)} if clause is not None else set()
+            if mapper is not None:
+                tables.add(mapper.local_table.name)
+            if tables - GLOBAL_TABLES:
+                return shard.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+engine = create_async_engine(DATABASE_URL, echo=False, future=True, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False
+    bind=engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+)
+
+# Optional read replica: `get_read_session` sends read-only endpoints there.
+# Its pool is not instrumented, /system/db-pool reports the primary.
+READ_DATABASE_URL = settings.database_read_url
+read_engine = create_async_engine(
+    READ_DATABASE_URL, echo=False, future=True, **engine_options(READ_DATABASE_URL, AsyncAdaptedQueuePool)
+) if READ_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(
+    bind=read_engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
 )
 
 Base = declarative_base()
@@ -16,3 +73,21 @@ async def get_session() -> AsyncSession:
 
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_session(request: Request, db: AsyncSession = Depends(get_session)) -> AsyncSession:
+    """Session for read-only endpoints: the replica, unless this client wrote recently."""
+    if read_engine is engine or PRIMARY_COOKIE in request.cookies:
+        yield db
+        return
+    async with ReadSessionLocal() as session:
+        # Follows the tenant's shard once authentication sets it on `db`
+        session.info["route"] = db.info.setdefault("route", {})
+        yield session
+
+
+def dialect_insert(db: AsyncSession):
+    """`insert()` of the session's dialect, which supports ON CONFLICT upserts."""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
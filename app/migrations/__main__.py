@@ -0,0 +1,38 @@
+"""
+Schema migrations CLI.
+
+    python -m app.migrations upgrade   # apply pending migrations
+    python -m app.migrations current   # show the applied and latest versions
+
+`--shard NAME` runs them against one of `settings.database_shards`.
+"""
+import argparse
+import asyncio
+
+from ..core.sharding import shard_router
+from .runner import LATEST_VERSION, current_version, pending, upgrade
+
+
+async def main(command: str, shard: str) -> None:
+    engine = shard_router.engine(shard)
+    try:
+        if command == "upgrade":
+            version = await upgrade(engine)
+            print(f"Schema at version {version}")
+        else:
+            async with engine.connect() as conn:
+                version = await current_version(conn)
+            print(f"Current version: {version if version is not None else 'empty database'}; latest: {LATEST_VERSION}")
+            for migration in pending(version or 0):
+                print(f"  pending {migration.version}: {migration.description}")
+    finally:
+        await engine.dispose()
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the database schema version.")
+    parser.add_argument("command", choices=["upgrade", "current"])
+    parser.add_argument("--shard", default="default", help="Database to migrate (default: the main one)")
+    args = parser.parse_args()
+    asyncio.run(main(args.command, args.shard))
@@ -0,0 +1,117 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in `schema_version`. `upgrade` runs the
+pending entries of `versions.MIGRATIONS` in order, each in its own
+transaction together with its version row (or in autocommit mode when it
+cannot run inside one, e.g. CREATE INDEX CONCURRENTLY). On PostgreSQL a
+session-level advisory lock makes concurrent upgrades (several workers or
+replicas booting at once) wait for each other instead of racing.
+
+A database without `schema_version` and without tables is created from the
+models and stamped with the latest version; an existing database without it
+starts at version 0, so the baseline migration brings legacy schemas up to
+date. Migrations must therefore be idempotent (IF NOT EXISTS).
+
+The application only checks the version at startup; see `python -m app.migrations`.
+"""
+import time
+from typing import List
+
+from sqlalchemy import Column, Float, Integer, String, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db import Base
+from .versions import MIGRATIONS, Migration
+
+ADVISORY_LOCK_KEY = 0x545056  # "TPV"
+
+
+class SchemaVersion(Base):
+
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String, nullable=False)
+    applied_at = Column(Float, nullable=False)
+
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+class SchemaOutdatedError(RuntimeError):
+    pass
+
+
+def table_names(conn) -> List[str]:
+    return inspect(conn).get_table_names()
+
+
+async def current_version(conn: AsyncConnection) -> int | None:
+    """Latest applied version; None for a database without any table."""
+    tables = await conn.run_sync(table_names)
+    if SchemaVersion.__tablename__ not in tables:
+        return 0 if tables else None
+    result = await conn.execute(select(func.max(SchemaVersion.version)))
+    return result.scalar() or 0
+
+
+def pending(version: int) -> List[Migration]:
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+async def record(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(
+        SchemaVersion.__table__.insert().values(
+            version=migration.version, description=migration.description, applied_at=time.time()
+        )
+    )
+
+
+async def upgrade(bind: AsyncEngine, log=print) -> int:
+    """Apply pending migrations; returns the resulting version."""
+    is_postgres = bind.dialect.name == "postgresql"
+    async with bind.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        if is_postgres:
+            await lock_conn.execute(select(func.pg_advisory_lock(ADVISORY_LOCK_KEY)))
+        try:
+            async with bind.begin() as conn:
+                version = await current_version(conn)
+                if version is None:
+                    # Fresh database: the models are the latest schema
+                    await conn.run_sync(Base.metadata.create_all)
+                    for migration in MIGRATIONS:
+                        await record(conn, migration)
+                    log(f"Schema created at version {LATEST_VERSION}")
+                    return LATEST_VERSION
+                await conn.run_sync(SchemaVersion.__table__.create, checkfirst=True)
+
+            for migration in pending(version):
+                log(f"Applying {migration.version}: {migration.description}")
+                if migration.transactional:
+                    async with bind.begin() as conn:
+                        await migration.upgrade(conn)
+                        await record(conn, migration)
+                else:
+                    async with bind.connect() as conn:
+                        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                        await migration.upgrade(conn)
+                        await record(conn, migration)
+                version = migration.version
+            return version
+        finally:
+            if is_postgres:
+                await lock_conn.execute(select(func.pg_advisory_unlock(ADVISORY_LOCK_KEY)))
+
+
+async def check(bind: AsyncEngine) -> int:
+    """Fail unless the database is at the latest version."""
+    async with bind.connect() as conn:
+        version = await current_version(conn)
+    if version != LATEST_VERSION:
+        raise SchemaOutdatedError(
+            f"Database schema is at version {version or 0}, this release needs {LATEST_VERSION}: "
+            "run `python -m app.migrations upgrade`"
+        )
+    return version
@@ -0,0 +1,218 @@
+"""
+Schema migrations, in order. Append new ones; never edit applied ones.
+"""
+from typing import Awaitable, Callable, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..db import Base
+# Every model, so that create_all sees the whole schema
+from ..auth import models as _auth_models  # noqa: F401
+from ..products import models as _products_models  # noqa: F401
+from ..sales import models as _sales_models  # noqa: F401
+from ..cash_closing import models as _cash_closing_models  # noqa: F401
+from ..tables import models as _tables_models  # noqa: F401
+from ..reports import models as _reports_models  # noqa: F401
+from ..core import models as _core_models  # noqa: F401
+from ..reports.rollups import rebuild_rollups
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[AsyncConnection], Awaitable[None]]
+    transactional: bool = True
+
+
+LEGACY_TENANT = "legacy_tenant"
+
+# Running totals of the sales not yet archived. Kept here rather than
+# imported from the service, so that the migration does not follow it.
+SEED_RUNNING_TOTALS = (
+    "INSERT INTO closing_running_totals "
+    "(tenant_id, payment_method, from_sales, to_sales, from_date, to_date, sales_count, total) "
+    "SELECT tenant_id, COALESCE(payment_method, 'cash'), MIN(id), MAX(id), MIN(created_at), MAX(created_at), "
+    "COUNT(id), SUM(total) FROM sales WHERE status NOT IN ('OPEN', 'CANCELLED') "
+    "GROUP BY tenant_id, COALESCE(payment_method, 'cash')"
+)
+
+
+async def baseline(conn: AsyncConnection) -> None:
+    """Bring a schema created by the old startup DDL up to date."""
+    await conn.run_sync(Base.metadata.create_all)
+    if conn.dialect.name == "postgresql":
+        # Columns added to existing tables before migrations existed
+        await conn.execute(text("ALTER TABLE sales ADD COLUMN IF NOT EXISTS closed_by_id INTEGER REFERENCES users(id)"))
+        for table in ("users", "products", "categories", "tables", "sales", "cash_closings"):
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS tenant_id VARCHAR DEFAULT '{LEGACY_TENANT}'"))
+            await conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_tenant_id ON {table} (tenant_id)"))
+        await conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS sku VARCHAR"))
+        await conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS category_id INTEGER REFERENCES categories(id)"))
+        await conn.execute(text("ALTER TABLE cash_closings ADD COLUMN IF NOT EXISTS totals_by_method JSON"))
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sales_tenant_status_created_at ON sales (tenant_id, status, created_at, id)"))
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sales_tenant_created_at ON sales (tenant_id, created_at, id)"))
+    # Closing running totals start from the sales not yet archived
+    if not (await conn.execute(text("SELECT COUNT(*) FROM closing_running_totals"))).scalar():
+        await conn.execute(text(SEED_RUNNING_TOTALS))
+
+
+COMPOSITE_INDEXES = (
+    # (tenant_id, status, created_at) is served by ix_sales_tenant_status_created_at
+    ("ix_sales_tenant_table_status", "sales", "tenant_id, table_id, status"),
+    ("ix_sale_lines_sale_id", "sale_lines", "sale_id"),
+    ("ix_products_tenant_sku", "products", "tenant_id, sku"),
+    ("ix_products_tenant_name", "products", "tenant_id, name"),
+    ("ix_cash_closings_tenant_id_id", "cash_closings", "tenant_id, id"),
+)
+
+
+async def composite_indexes(conn: AsyncConnection) -> None:
+    """Tenant-aware indexes for the hot query shapes, built without blocking writes."""
+    concurrently = "CONCURRENTLY " if conn.dialect.name == "postgresql" else ""
+    for name, table, columns in COMPOSITE_INDEXES:
+        if concurrently and await invalid_index(conn, name):
+            # Left behind by an interrupted build: IF NOT EXISTS would keep it as is
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        await conn.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+async def invalid_index(conn: AsyncConnection, name: str) -> bool:
+    """Whether a PostgreSQL index exists but is not usable (pg_index.indisvalid)."""
+    valid = (await conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": name})).scalar()
+    return valid is False
+
+
+async def open_table_unique(conn: AsyncConnection) -> None:
+    """One open account per table, enforced by a partial unique index."""
+    duplicates = (await conn.execute(text(
+        "SELECT tenant_id, table_id, COUNT(*) FROM sales "
+        "WHERE status = 'OPEN' AND table_id IS NOT NULL GROUP BY tenant_id, table_id HAVING COUNT(*) > 1"
+    ))).all()
+    if duplicates:
+        tables = ", ".join(f"{tenant_id}/{table_id} ({count})" for tenant_id, table_id, count in duplicates)
+        raise RuntimeError(f"Tables with more than one open account, close or merge them first: {tables}")
+    # Not CONCURRENTLY: a failed build must not leave an invalid index behind IF NOT EXISTS
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_sales_open_table ON sales (tenant_id, table_id) WHERE status = 'OPEN'"
+    ))
+
+
+async def tenant_directory(conn: AsyncConnection) -> None:
+    """Directory of tenants placed in a shard (app/core/sharding.py)."""
+    await conn.run_sync(_core_models.TenantShard.__table__.create, checkfirst=True)
+
+
+# (table, archive, DDL with AUTOINCREMENT, indexes) as of this migration
+AUTOINCREMENT_TABLES = (
+    (
+        "sales", "sales_archive",
+        "CREATE TABLE sales_new (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, total FLOAT NOT NULL, "
+        "payment_method VARCHAR, status VARCHAR, created_at FLOAT, user_id INTEGER, closed_by_id INTEGER, "
+        "table_id INTEGER, name VARCHAR, tenant_id VARCHAR NOT NULL, "
+        "FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(closed_by_id) REFERENCES users (id), "
+        "FOREIGN KEY(table_id) REFERENCES tables (id))",
+        (
+            "CREATE INDEX ix_sales_id ON sales (id)",
+            "CREATE INDEX ix_sales_tenant_id ON sales (tenant_id)",
+            "CREATE INDEX ix_sales_status ON sales (status)",
+            "CREATE INDEX ix_sales_tenant_status_created_at ON sales (tenant_id, status, created_at, id)",
+            "CREATE INDEX ix_sales_tenant_created_at ON sales (tenant_id, created_at, id)",
+            "CREATE INDEX ix_sales_tenant_table_status ON sales (tenant_id, table_id, status)",
+            "CREATE UNIQUE INDEX ux_sales_open_table ON sales (tenant_id, table_id) WHERE status = 'OPEN'",
+        ),
+    ),
+    (
+        "sale_lines", "sale_lines_archive",
+        "CREATE TABLE sale_lines_new (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, sale_id INTEGER NOT NULL, "
+        "product_id INTEGER NOT NULL, quantity INTEGER NOT NULL, price_unit FLOAT NOT NULL, line_total FLOAT NOT NULL, "
+        "FOREIGN KEY(sale_id) REFERENCES sales (id), FOREIGN KEY(product_id) REFERENCES products (id))",
+        (
+            "CREATE INDEX ix_sale_lines_id ON sale_lines (id)",
+            "CREATE INDEX ix_sale_lines_sale_id ON sale_lines (sale_id)",
+        ),
+    ),
+)
+
+
+async def renumber_reused_ids(conn: AsyncConnection, table: str, archive: str) -> int:
+    """Give live rows whose id is already archived a fresh id; returns how many moved."""
+    reused = (await conn.execute(text(
+        f"SELECT id FROM {table} WHERE id IN (SELECT id FROM {archive}) ORDER BY id"
+    ))).scalars().all()
+    if not reused:
+        return 0
+    next_id = (await conn.execute(text(
+        f"SELECT MAX(COALESCE((SELECT MAX(id) FROM {table}), 0), COALESCE((SELECT MAX(id) FROM {archive}), 0))"
+    ))).scalar()
+    for old_id in reused:
+        next_id += 1
+        await conn.execute(text(f"UPDATE {table} SET id = :new WHERE id = :old"), {"new": next_id, "old": old_id})
+        if table == "sales":
+            await conn.execute(text("UPDATE sale_lines SET sale_id = :new WHERE sale_id = :old"), {"new": next_id, "old": old_id})
+    return len(reused)
+
+
+async def sqlite_autoincrement(conn: AsyncConnection) -> None:
+    """
+    Never reuse sale ids on SQLite.
+
+    Archived sales keep their ids, but SQLite hands out MAX(id) + 1, so after
+    a Z closing emptied `sales` new sales collided with archived ones. Live
+    rows already sharing an id with the archive are renumbered (the running
+    totals are recomputed for their new ids) and the tables are rebuilt with
+    AUTOINCREMENT, starting past every archived id. PostgreSQL sequences
+    never go back: nothing to do there.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    renumbered = 0
+    for table, archive, create, indexes in AUTOINCREMENT_TABLES:
+        sql = (await conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": table})).scalar()
+        if "AUTOINCREMENT" in sql.upper():
+            continue
+        renumbered += await renumber_reused_ids(conn, table, archive)
+        await conn.execute(text(create))
+        await conn.execute(text(f"INSERT INTO {table}_new SELECT * FROM {table}"))
+        await conn.execute(text(f"DROP TABLE {table}"))
+        await conn.execute(text(f"ALTER TABLE {table}_new RENAME TO {table}"))
+        for index in indexes:
+            await conn.execute(text(index))
+        last_id = (await conn.execute(text(
+            f"SELECT MAX(COALESCE((SELECT MAX(id) FROM {table}), 0), COALESCE((SELECT MAX(id) FROM {archive}), 0))"
+        ))).scalar()
+        await conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table})
+        await conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table, "seq": last_id})
+    if renumbered:
+        await conn.execute(text("DELETE FROM closing_running_totals"))
+        await conn.execute(text(SEED_RUNNING_TOTALS))
+
+
+async def backfill_rollups(conn: AsyncConnection) -> None:
+    """
+    Rebuild the sales rollups from the whole history.
+
+    The baseline created `sales_rollups` empty, and rollups are only added as
+    sales settle, so reports over the sales settled before it read zero. The
+    bucketing lives in Python (report timezone, product categories), hence
+    the shared rebuild rather than inline SQL; it replaces every row, so it is
+    also right for databases that have been selling since the baseline.
+    """
+    # The session joins the migration transaction: its commit does not end it
+    async with AsyncSession(bind=conn, expire_on_commit=False) as db:
+        await rebuild_rollups(db)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Baseline: multi-tenant schema, archive, running totals and rollups", baseline),
+    Migration(2, "Composite tenant-aware indexes", composite_indexes, transactional=False),
+    Migration(3, "One open account per table", open_table_unique),
+    Migration(4, "Tenant shard directory", tenant_directory),
+    Migration(5, "Sale ids never reused on SQLite", sqlite_autoincrement),
+    Migration(6, "Sales rollups backfilled from the history", backfill_rollups),
+]
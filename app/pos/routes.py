@@ -0,0 +1,78 @@
+"""POS routes."""
+from typing import List
+
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .schemas import PosBootstrap, PosCatalog, TableState, ActiveSaleSummary
+from ..auth.dependencies import get_current_user
+from ..auth.models import User
+from ..db import get_session
+from ..products.catalog import catalog_cache, snapshot_response
+from ..products.models import Product, Category
+from ..products.schemas import ProductOut, CategoryOut
+from ..sales.models import Sale
+from ..tables.models import Table
+
+router = APIRouter()
+
+tables_adapter = TypeAdapter(List[TableState])
+active_sales_adapter = TypeAdapter(List[ActiveSaleSummary])
+
+
+@router.get("/bootstrap", response_model=PosBootstrap)
+async def bootstrap(
+    request: Request,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Full catalog, tables with their open sale and open accounts, in one response."""
+    tenant_id = current_user.tenant_id
+
+    async def load_catalog() -> bytes:
+        cat_res = await db.execute(select(Category).where(Category.tenant_id == tenant_id))
+        categories = {category.id: category for category in cat_res.scalars()}
+        prod_res = await db.execute(select(Product).where(Product.tenant_id == tenant_id))
+        products = [
+            ProductOut(
+                id=p.id, name=p.name, price=p.price, tax=p.tax, active=p.active,
+                category_id=p.category_id, sku=p.sku,
+                category=CategoryOut.model_validate(categories[p.category_id]) if p.category_id in categories else None,
+            )
+            for p in prod_res.scalars()
+        ]
+        return PosCatalog(
+            products=products,
+            categories=[CategoryOut.model_validate(c) for c in categories.values()],
+        ).model_dump_json().encode("utf-8")
+
+    # The catalog is shared with the product routes' snapshot cache
+    _, catalog = await catalog_cache.get(tenant_id, ("bootstrap",), load_catalog)
+
+    sales_res = await db.execute(
+        select(Sale.id, Sale.total, Sale.table_id, Sale.name, Sale.created_at, Sale.user_id)
+        .where(Sale.tenant_id == tenant_id, Sale.status == "OPEN")
+        .order_by(Sale.created_at.desc())
+    )
+    active_sales = [ActiveSaleSummary.model_validate(row) for row in sales_res.all()]
+    open_by_table = {sale.table_id: sale.id for sale in active_sales if sale.table_id is not None}
+
+    tables_res = await db.execute(select(Table).where(Table.tenant_id == tenant_id))
+    tables = [
+        TableState(
+            id=t.id, name=t.name, description=t.description, is_active=t.is_active,
+            open_sale_id=open_by_table.get(t.id),
+        )
+        for t in tables_res.scalars()
+    ]
+
+    body = b"".join([
+        b'{"catalog":', catalog,
+        b',"tables":', tables_adapter.dump_json(tables),
+        b',"active_sales":', active_sales_adapter.dump_json(active_sales),
+        b"}",
+    ])
+    etag = catalog_cache.etag(body)
+    return snapshot_response(request, etag, body)
@@ -0,0 +1,37 @@
+"""
+POS schemas module.
+"""
+from typing import List
+
+from pydantic import BaseModel
+
+from ..products.schemas import ProductOut, CategoryOut
+from ..tables.schemas import TableOut
+
+
+class PosCatalog(BaseModel):
+    products: List[ProductOut]
+    categories: List[CategoryOut]
+
+
+class TableState(TableOut):
+    open_sale_id: int | None = None
+
+
+class ActiveSaleSummary(BaseModel):
+    id: int
+    total: float
+    table_id: int | None = None
+    name: str | None = None
+    created_at: float
+    user_id: int | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class PosBootstrap(BaseModel):
+    """Everything the POS needs on load, in one response."""
+    catalog: PosCatalog
+    tables: List[TableState]
+    active_sales: List[ActiveSaleSummary]
@@ -0,0 +1,87 @@
+"""
+Catalog snapshot cache.
+
+`GET /products/` and `GET /products/categories/` are served from serialized
+per-tenant snapshots. Every catalog write bumps the tenant's version, which
+drops its snapshots; other workers pick up changes once `ttl` expires.
+ETags are content hashes, so they agree across workers and restarts.
+With a read replica, snapshots loaded within `settle` seconds of a write
+are served but not kept, as the replica may not have the write yet.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import Request, Response, status
+
+from ..config import settings
+
+
+class CatalogCache:
+
+    def __init__(self, ttl: float, max_tenants: int, settle: float = 0.0):
+        self.ttl = ttl
+        self.max_tenants = max_tenants
+        self.settle = settle
+        self._versions: Dict[str, int] = {}
+        self._bumped_at: Dict[str, float] = {}
+        # tenant_id -> {key: (version, expires_at, etag, body)}
+        self._snapshots: "OrderedDict[str, Dict[Hashable, Tuple[int, float, str, bytes]]]" = OrderedDict()
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        """Strong ETag derived from the response body."""
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def version(self, tenant_id: str) -> int:
+        return self._versions.get(tenant_id, 0)
+
+    def bump(self, tenant_id: str) -> None:
+        """Invalidate the tenant's snapshots after a catalog write."""
+        self._versions[tenant_id] = self.version(tenant_id) + 1
+        self._bumped_at[tenant_id] = time.monotonic()
+        self._snapshots.pop(tenant_id, None)
+
+    async def get(
+        self,
+        tenant_id: str,
+        key: Hashable,
+        load: Callable[[], Awaitable[bytes]],
+    ) -> Tuple[str, bytes]:
+        """Return `(etag, body)`, calling `load` only when there is no fresh snapshot."""
+        version = self.version(tenant_id)
+        started = time.monotonic()
+        snapshots = self._snapshots.get(tenant_id)
+        if snapshots is not None:
+            self._snapshots.move_to_end(tenant_id)
+            cached = snapshots.get(key)
+            if cached is not None and cached[0] == version and cached[1] > time.monotonic():
+                return cached[2], cached[3]
+
+        body = await load()
+        etag = self.etag(body)
+        settled = started - self._bumped_at.get(tenant_id, float("-inf")) >= self.settle
+        if self.version(tenant_id) == version and settled:
+            # Only keep it if no write happened while loading, nor just before
+            self._snapshots.setdefault(tenant_id, {})[key] = (version, time.monotonic() + self.ttl, etag, body)
+            self._snapshots.move_to_end(tenant_id)
+            while len(self._snapshots) > self.max_tenants:
+                self._snapshots.popitem(last=False)
+        return etag, body
+
+
+catalog_cache = CatalogCache(
+    settings.catalog_cache_ttl_seconds,
+    settings.catalog_cache_max_tenants,
+    settings.read_your_writes_seconds if settings.database_read_url else 0.0,
+)
+
+
+def snapshot_response(request: Request, etag: str, body: bytes) -> Response:
+    """200 with the snapshot, or 304 when the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
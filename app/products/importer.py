@@ -0,0 +1,215 @@
+"""
+Bulk catalog import.
+
+Parses a CSV or NDJSON upload as it streams in and upserts products by SKU
+in batches of `IMPORT_BATCH_SIZE`: one lookup of existing SKUs, one
+multi-row INSERT for new products and one executemany UPDATE for the rest.
+Categories are matched by name (case-insensitive) against a single upfront
+load and missing ones are created per batch. Invalid rows are reported and
+skipped, as are the earlier rows of a SKU repeated inside a batch (the last
+one wins); everything else is written in the caller's transaction.
+
+CSV uploads need a header row; quoted fields may contain commas but not
+line breaks. Columns / keys: name, price, sku, category, tax, active.
+"""
+import codecs
+import csv
+import json
+import math
+from typing import AsyncIterator, Dict, Iterable, List
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .models import Product, Category
+from .schemas import ImportReport, ImportRowError
+
+IMPORT_BATCH_SIZE = 500
+
+TRUE_VALUES = {"1", "true", "yes", "si", "sí", "y"}
+FALSE_VALUES = {"0", "false", "no", "n"}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().casefold()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Valor booleano no válido: {value}")
+
+
+def parse_row(record: dict) -> dict:
+    """Validate a raw record into product fields plus its category name."""
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("Falta el nombre")
+    category = str(record.get("category") or "").strip()
+    if not category:
+        raise ValueError("Falta la categoría")
+    try:
+        price = float(record["price"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Precio no válido")
+    if not math.isfinite(price) or price < 0:
+        raise ValueError("Precio no válido")
+    tax = record.get("tax")
+    try:
+        tax = float(tax) if tax not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        raise ValueError("Impuesto no válido")
+    if not math.isfinite(tax) or tax < 0:
+        raise ValueError("Impuesto no válido")
+    active = record.get("active")
+    active = parse_bool(active) if active not in (None, "") else True
+    sku = str(record.get("sku") or "").strip() or None
+    return {"name": name, "price": price, "tax": tax, "active": active, "sku": sku, "category": category}
+
+
+def existing_skus_query(tenant_id: str, skus: Iterable[str]):
+    return select(Product.sku, Product.id).where(Product.tenant_id == tenant_id, Product.sku.in_(list(skus)))
+
+
+class CatalogImporter:
+
+    def __init__(self, db: AsyncSession, tenant_id: str):
+        self.db = db
+        self.tenant_id = tenant_id
+        self.categories: Dict[str, int] = {}
+        self.batch: List[tuple] = []
+        self.report = ImportReport()
+
+    async def load_categories(self) -> None:
+        result = await self.db.execute(
+            select(Category.id, Category.name).where(Category.tenant_id == self.tenant_id).order_by(Category.id)
+        )
+        for category_id, name in result.all():
+            self.categories.setdefault(name.strip().casefold(), category_id)
+
+    def error(self, row: int, message: str, sku: str | None = None) -> None:
+        self.report.failed += 1
+        self.report.errors.append(ImportRowError(row=row, sku=sku, error=message))
+
+    async def add(self, row: int, record) -> None:
+        if not isinstance(record, dict):
+            self.error(row, "Formato de fila no válido")
+            return
+        try:
+            fields = parse_row(record)
+        except ValueError as e:
+            sku = record.get("sku")
+            self.error(row, str(e), str(sku) if sku else None)
+            return
+        self.batch.append((row, fields))
+        if len(self.batch) >= IMPORT_BATCH_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+
+        # Last row wins for a SKU repeated inside the batch; the earlier ones are reported
+        last_row = {fields["sku"]: row for row, fields in batch if fields["sku"] is not None}
+        kept = []
+        for row, fields in batch:
+            later = last_row.get(fields["sku"], row)
+            if later != row:
+                self.error(row, f"SKU repetido en la fila {later}", fields["sku"])
+            else:
+                kept.append((row, fields))
+        batch = kept
+
+        # Categories: create the ones this batch introduces, in one statement
+        missing = {}
+        for _, fields in batch:
+            key = fields["category"].casefold()
+            if key not in self.categories:
+                missing.setdefault(key, fields["category"])
+        if missing:
+            result = await self.db.execute(
+                insert(Category).returning(Category.id, Category.name),
+                [{"name": name, "tenant_id": self.tenant_id} for name in missing.values()],
+            )
+            for category_id, name in result.all():
+                self.categories[name.casefold()] = category_id
+            self.report.categories_created += len(missing)
+
+        # Products
+        by_sku = {}
+        rows = []
+        for row, fields in batch:
+            values = {
+                "name": fields["name"],
+                "price": fields["price"],
+                "tax": fields["tax"],
+                "active": fields["active"],
+                "sku": fields["sku"],
+                "category_id": self.categories[fields["category"].casefold()],
+                "tenant_id": self.tenant_id,
+            }
+            if fields["sku"] is None:
+                rows.append(values)
+            else:
+                by_sku[fields["sku"]] = values
+
+        existing = {}
+        if by_sku:
+            result = await self.db.execute(existing_skus_query(self.tenant_id, by_sku.keys()))
+            existing = dict(result.all())
+
+        updates = []
+        for sku, values in by_sku.items():
+            if sku in existing:
+                updates.append({"id": existing[sku], **values})
+            else:
+                rows.append(values)
+
+        if rows:
+            await self.db.execute(insert(Product), rows)
+            self.report.created += len(rows)
+        if updates:
+            await self.db.execute(update(Product), updates)
+            self.report.updated += len(updates)
+
+    async def run(self, chunks: AsyncIterator[bytes], fmt: str) -> ImportReport:
+        await self.load_categories()
+        header = None
+        row = 0
+        async for line in iter_lines(chunks):
+            if not line.strip():
+                continue
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = [column.strip().casefold() for column in values]
+                    continue
+                row += 1
+                await self.add(row, dict(zip(header, values)))
+            else:
+                row += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    self.error(row, "JSON no válido")
+                    continue
+                await self.add(row, record)
+        await self.flush()
+        return self.report
@@ -2,38 +2,80 @@
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 
+from sqlalchemy import Numeric, cast, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from .models import Product, Category
-from .schemas import ProductCreate, ProductUpdate, ProductOut, CategoryCreate, CategoryOut, CategoryUpdate
-from ..db import get_session
+from .schemas import (
+    ProductCreate, ProductUpdate, ProductOut, CategoryCreate, CategoryOut, CategoryUpdate, ImportReport,
+    ProductBulkUpdate, ProductBulkResult,
+)
+from ..db import get_session, get_read_session
 from ..auth.dependencies import get_current_user
 from ..auth.models import User
+from .catalog import catalog_cache, snapshot_response
+from .search import product_index
+from .importer import CatalogImporter
 
 router = APIRouter()
 
+products_adapter = TypeAdapter(List[ProductOut])
+categories_adapter = TypeAdapter(List[CategoryOut])
+
 
 @router.get("/", response_model=List[ProductOut])
 async def list_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    async def load() -> bytes:
+        query = select(Product).options(selectinload(Product.category)).where(Product.tenant_id == current_user.tenant_id).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return products_adapter.dump_json(result.scalars().all(), by_alias=True)
+
+    etag, body = await catalog_cache.get(current_user.tenant_id, ("products", skip, limit), load)
+    return snapshot_response(request, etag, body)
+
+
+@router.get("/search", response_model=List[ProductOut])
+async def search_products(
+    q: str = Query(..., min_length=1),
+    substring: bool = False,
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Name search: prefix by default, anywhere in the name with `substring`."""
+    index = await product_index.get(db, current_user.tenant_id)
+    return index.search(q, substring, limit)
+
+
+@router.get("/sku/{sku}", response_model=ProductOut)
+async def get_product_by_sku(
+    sku: str,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    query = select(Product).options(selectinload(Product.category)).where(Product.tenant_id == current_user.tenant_id).offset(skip).limit(limit)
-    result = await db.execute(query)
-    products = result.scalars().all()
-    return products
+    """Exact SKU / barcode lookup."""
+    index = await product_index.get(db, current_user.tenant_id)
+    product = index.get_by_sku(sku)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return product
 
 
 @router.get("/{product_id}", response_model=ProductOut)
 async def get_product(
     product_id: int,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
 
@@ -61,12 +103,86 @@ async def create_product(
     product.tenant_id = current_user.tenant_id # Assign Tenant
     db.add(product)
     await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
     # Reload with relation for Pydantic response
     result = await db.execute(select(Product).options(selectinload(Product.category)).where(Product.id == product.id))
     product = result.scalar_one()
+    product_index.upsert(current_user.tenant_id, product)
     return product
 
 
+@router.post("/import", response_model=ImportReport)
+async def import_products(
+    request: Request,
+    import_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk upsert of products by SKU from a streamed CSV or NDJSON request body.
+
+    Rows are written in one transaction; invalid rows are skipped and listed in the report.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores pueden importar el catálogo")
+
+    importer = CatalogImporter(db, current_user.tenant_id)
+    report = await importer.run(request.stream(), import_format)
+    await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
+    product_index.invalidate(current_user.tenant_id)
+    return report
+
+
+@router.post("/bulk-update", response_model=ProductBulkResult)
+async def bulk_update_products(
+    bulk_in: ProductBulkUpdate,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Patch or reprice every matching product with a single UPDATE."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores pueden modificar precios en bloque")
+
+    criteria = bulk_in.filter
+    if criteria.category_id is None and criteria.ids is None and criteria.skus is None:
+        raise HTTPException(status_code=400, detail="Indique una categoría, ids o SKUs")
+
+    conditions = [Product.tenant_id == current_user.tenant_id]
+    if criteria.category_id is not None:
+        conditions.append(Product.category_id == criteria.category_id)
+    if criteria.ids is not None:
+        conditions.append(Product.id.in_(criteria.ids))
+    if criteria.skus is not None:
+        conditions.append(Product.sku.in_(criteria.skus))
+
+    values = bulk_in.patch.model_dump(exclude_none=True)
+    if bulk_in.price_percent is not None:
+        if "price" in values:
+            raise HTTPException(status_code=400, detail="Use precio o porcentaje, no ambos")
+        factor = 1 + bulk_in.price_percent / 100
+        values["price"] = func.round(cast(Product.price * factor, Numeric), 2)
+        # All or nothing: no matching product may end up with a negative price
+        negative = await db.execute(select(Product.id).where(*conditions, values["price"] < 0).limit(1))
+        if negative.first() is not None:
+            raise HTTPException(status_code=400, detail="El ajuste dejaría precios negativos")
+    if not values:
+        raise HTTPException(status_code=400, detail="No hay cambios que aplicar")
+
+    if "category_id" in values:
+        cat_res = await db.execute(select(Category.id).where(Category.id == values["category_id"], Category.tenant_id == current_user.tenant_id))
+        if cat_res.scalar_one_or_none() is None:
+            raise HTTPException(status_code=400, detail="Categoría no válida")
+
+    result = await db.execute(
+        update(Product).where(*conditions).values(**values).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
+    product_index.invalidate(current_user.tenant_id)
+    return ProductBulkResult(updated=result.rowcount)
+
+
 @router.put("/{product_id}", response_model=ProductOut)
 async def update_product(
     product_id: int,
@@ -87,9 +203,11 @@ async def update_product(
 
     db.add(product)
     await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
     # Reload with relation
     result = await db.execute(select(Product).options(selectinload(Product.category)).where(Product.id == product.id))
     product = result.scalar_one()
+    product_index.upsert(current_user.tenant_id, product)
     return product
 
 
@@ -104,21 +222,26 @@ async def create_category(
     category.tenant_id = current_user.tenant_id
     db.add(category)
     await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
     await db.refresh(category)
     return category
 
 
 @router.get("/categories/", response_model=List[CategoryOut])
 async def list_categories(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
 
-    result = await db.execute(select(Category).where(Category.tenant_id == current_user.tenant_id).offset(skip).limit(limit))
-    categories = result.scalars().all()
-    return categories
+    async def load() -> bytes:
+        result = await db.execute(select(Category).where(Category.tenant_id == current_user.tenant_id).offset(skip).limit(limit))
+        return categories_adapter.dump_json(result.scalars().all(), by_alias=True)
+
+    etag, body = await catalog_cache.get(current_user.tenant_id, ("categories", skip, limit), load)
+    return snapshot_response(request, etag, body)
 
 
 @router.put("/categories/{category_id}", response_model=CategoryOut)
@@ -137,6 +260,9 @@ async def update_category(
     category.name = category_in.name
     db.add(category)
     await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
+    # Indexed products embed the category name
+    product_index.invalidate(current_user.tenant_id)
     await db.refresh(category)
     return category
 
@@ -155,4 +281,6 @@ async def delete_product(
 
     await db.delete(product)
     await db.commit()
+    catalog_cache.bump(current_user.tenant_id)
+    product_index.remove(current_user.tenant_id, product_id)
     return None
@@ -1,6 +1,8 @@
 
 
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 
 
 
@@ -53,4 +55,42 @@ class ProductOut(ProductBase):
     category: CategoryOut | None = None
 
     class Config:
-        from_attributes = True  
+        from_attributes = True
+
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row, header excluded
+    sku: str | None = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    categories_created: int = 0
+    errors: List[ImportRowError] = []
+
+
+class ProductBulkFilter(BaseModel):
+    """Products to change; criteria are combined with AND."""
+    category_id: int | None = None
+    ids: List[int] | None = None
+    skus: List[str] | None = None
+
+
+class ProductBulkPatch(BaseModel):
+    price: float | None = Field(None, ge=0)
+    tax: float | None = None
+    active: bool | None = None
+    category_id: int | None = None
+
+
+class ProductBulkUpdate(BaseModel):
+    filter: ProductBulkFilter
+    patch: ProductBulkPatch = ProductBulkPatch()
+    price_percent: float | None = Field(None, gt=-100)  # e.g. 3 for +3%, -10 for -10%
+
+
+class ProductBulkResult(BaseModel):
+    updated: int
@@ -0,0 +1,131 @@
+"""
+Product search index.
+
+Per-tenant in-memory index for name search (prefix and substring) and exact
+SKU/barcode lookup. A tenant's index is built with one query on first use and
+kept current by the product write routes; `ttl` bounds how long another
+worker's writes can go unseen. At most `max_tenants` indexes are kept, least
+recently used first out.
+"""
+import bisect
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from .models import Product
+from .schemas import ProductOut
+from ..config import settings
+
+
+def normalize(text: str) -> str:
+    return text.casefold().strip()
+
+
+def tenant_products_query(tenant_id: str):
+    return select(Product).options(selectinload(Product.category)).where(Product.tenant_id == tenant_id)
+
+
+class TenantProductIndex:
+
+    def __init__(self, products: List[ProductOut]):
+        self.built_at = time.monotonic()
+        self.products: Dict[int, ProductOut] = {}
+        self.by_sku: Dict[str, int] = {}
+        self.names: List[Tuple[str, int]] = []  # Sorted (normalized name, id)
+        for product in products:
+            self._add(product)
+        self.names.sort()
+
+    def _add(self, product: ProductOut) -> None:
+        self.products[product.id] = product
+        if product.sku:
+            self.by_sku[product.sku] = product.id
+        self.names.append((normalize(product.name), product.id))
+
+    def upsert(self, product: ProductOut) -> None:
+        self.remove(product.id)
+        self.products[product.id] = product
+        if product.sku:
+            self.by_sku[product.sku] = product.id
+        bisect.insort(self.names, (normalize(product.name), product.id))
+
+    def remove(self, product_id: int) -> None:
+        old = self.products.pop(product_id, None)
+        if old is None:
+            return
+        entry = (normalize(old.name), old.id)
+        position = bisect.bisect_left(self.names, entry)
+        if position < len(self.names) and self.names[position] == entry:
+            del self.names[position]
+        if old.sku and self.by_sku.get(old.sku) == product_id:
+            del self.by_sku[old.sku]
+            # SKUs are not unique in the schema: fall back to another holder
+            for product in self.products.values():
+                if product.sku == old.sku:
+                    self.by_sku[old.sku] = product.id
+                    break
+
+    def get_by_sku(self, sku: str) -> Optional[ProductOut]:
+        product_id = self.by_sku.get(sku)
+        return self.products.get(product_id) if product_id is not None else None
+
+    def search(self, query: str, substring: bool, limit: int) -> List[ProductOut]:
+        query = normalize(query)
+        results = []
+        if substring:
+            for name, product_id in self.names:
+                if query in name:
+                    results.append(self.products[product_id])
+                    if len(results) >= limit:
+                        break
+            return results
+
+        position = bisect.bisect_left(self.names, (query, -1))
+        while position < len(self.names) and len(results) < limit:
+            name, product_id = self.names[position]
+            if not name.startswith(query):
+                break
+            results.append(self.products[product_id])
+            position += 1
+        return results
+
+
+class ProductSearchIndex:
+
+    def __init__(self, ttl: float, max_tenants: int):
+        self.ttl = ttl
+        self.max_tenants = max_tenants
+        self._tenants: "OrderedDict[str, TenantProductIndex]" = OrderedDict()
+
+    async def get(self, db: AsyncSession, tenant_id: str) -> TenantProductIndex:
+        """The tenant's index, built with a single query when missing or stale."""
+        index = self._tenants.get(tenant_id)
+        if index is None or index.built_at + self.ttl < time.monotonic():
+            result = await db.execute(tenant_products_query(tenant_id))
+            index = TenantProductIndex([ProductOut.model_validate(p) for p in result.scalars()])
+            self._tenants[tenant_id] = index
+        self._tenants.move_to_end(tenant_id)
+        while len(self._tenants) > self.max_tenants:
+            self._tenants.popitem(last=False)
+        return index
+
+    def upsert(self, tenant_id: str, product: Product) -> None:
+        index = self._tenants.get(tenant_id)
+        if index is not None:
+            index.upsert(ProductOut.model_validate(product))
+
+    def remove(self, tenant_id: str, product_id: int) -> None:
+        index = self._tenants.get(tenant_id)
+        if index is not None:
+            index.remove(product_id)
+
+    def invalidate(self, tenant_id: str) -> None:
+        """Drop the tenant's index; it is rebuilt on the next lookup."""
+        self._tenants.pop(tenant_id, None)
+
+
+product_index = ProductSearchIndex(settings.product_index_ttl_seconds, settings.product_index_max_tenants)
@@ -0,0 +1,292 @@
+"""
+Ad-hoc sales analytics.
+
+For questions the rollups do not answer. A tenant's live and archived
+settled sales in a date range are streamed in `LOAD_BATCH_SIZE` batches into
+NumPy arrays (one entry per sale line), and group-bys, percentiles and
+top-N rankings run as vectorized operations over them, in a worker thread so
+that the event loop keeps serving other requests.
+
+Results are cached per tenant, range and query, and keyed by a watermark
+(last sale id, sales settled since the last Z closing, last closing id), so
+they are reused until the tenant sells or closes again.
+
+NumPy is listed in requirements.txt; an install without it still boots,
+and the analytics endpoints answer 501.
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Hashable, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .rollups import report_tz
+from ..cash_closing.models import ArchivedSale, ArchivedSaleLine, CashClosing, RunningTotal
+from ..cash_closing.service import EXCLUDED_STATUSES
+from ..config import settings
+from ..products.models import Product
+from ..sales.models import Sale, SaleLine
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency
+    np = None
+
+LOAD_BATCH_SIZE = 5000
+
+LINE_DIMENSIONS = ("product", "category")
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise HTTPException(status_code=501, detail="El módulo de análisis requiere numpy")
+
+
+def lines_query(sale_model, line_model, tenant_id: str, date_from: float | None, date_to: float | None):
+    query = (
+        select(
+            sale_model.id, sale_model.created_at, sale_model.payment_method,
+            func.coalesce(sale_model.closed_by_id, sale_model.user_id), sale_model.total,
+            line_model.product_id, Product.category_id, line_model.quantity, line_model.line_total,
+        )
+        .select_from(sale_model)
+        .outerjoin(line_model, line_model.sale_id == sale_model.id)
+        .outerjoin(Product, Product.id == line_model.product_id)
+        .where(sale_model.tenant_id == tenant_id, sale_model.status.notin_(EXCLUDED_STATUSES))
+        .execution_options(yield_per=LOAD_BATCH_SIZE)
+    )
+    if date_from is not None:
+        query = query.where(sale_model.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(sale_model.created_at < date_to)
+    return query
+
+
+class SalesFrame:
+    """Columnar settled sale lines; sales without lines have one entry with product -1."""
+
+    def __init__(self, columns: Dict[str, "np.ndarray"], payment_methods: List[str]):
+        self.payment_methods = payment_methods
+        self.sale_id = columns["sale_id"]
+        self.product = columns["product"]
+        self.category = columns["category"]
+        self.quantity = columns["quantity"]
+        self.line_total = columns["line_total"]
+
+        # Sale level: one entry per distinct sale
+        self.sales, first, self.line_sale = np.unique(self.sale_id, return_index=True, return_inverse=True)
+        self.sale_total = columns["total"][first]
+        self.sale_payment = columns["payment"][first]
+        self.sale_user = columns["user"][first]
+        self.sale_quantity = np.bincount(self.line_sale, weights=self.quantity, minlength=len(self.sales))
+        self.sale_hour, self.sale_weekday = local_hour_and_weekday(columns["created_at"][first])
+
+    def __len__(self) -> int:
+        return len(self.sales)
+
+    @classmethod
+    async def load(cls, db: AsyncSession, tenant_id: str, date_from: float | None, date_to: float | None) -> "SalesFrame":
+        chunks: Dict[str, list] = {name: [] for name in (
+            "sale_id", "created_at", "payment", "user", "total", "product", "category", "quantity", "line_total",
+        )}
+        payment_codes: Dict[str, int] = {}
+        for sale_model, line_model in ((ArchivedSale, ArchivedSaleLine), (Sale, SaleLine)):
+            result = await db.stream(lines_query(sale_model, line_model, tenant_id, date_from, date_to))
+            async for rows in result.partitions():
+                (sale_id, created_at, payment, user, total, product, category, quantity, line_total) = zip(*rows)
+                chunks["sale_id"].append(np.array(sale_id, dtype=np.int64))
+                chunks["created_at"].append(np.array(created_at, dtype=np.float64))
+                chunks["payment"].append(np.array(
+                    [payment_codes.setdefault(method or "cash", len(payment_codes)) for method in payment],
+                    dtype=np.int32,
+                ))
+                chunks["user"].append(np.array([-1 if value is None else value for value in user], dtype=np.int64))
+                chunks["total"].append(np.array(total, dtype=np.float64))
+                chunks["product"].append(np.array([-1 if value is None else value for value in product], dtype=np.int64))
+                chunks["category"].append(np.array([-1 if value is None else value for value in category], dtype=np.int64))
+                chunks["quantity"].append(np.array([value or 0 for value in quantity], dtype=np.int64))
+                chunks["line_total"].append(np.array([value or 0.0 for value in line_total], dtype=np.float64))
+
+        # Concatenating and indexing the arrays is CPU-bound: keep it off the event loop
+        return await asyncio.to_thread(cls.from_chunks, chunks, list(payment_codes))
+
+    @classmethod
+    def from_chunks(cls, chunks: Dict[str, list], payment_methods: List[str]) -> "SalesFrame":
+        dtypes = {"created_at": np.float64, "total": np.float64, "line_total": np.float64, "payment": np.int32}
+        columns = {
+            name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes.get(name, np.int64))
+            for name, parts in chunks.items()
+        }
+        return cls(columns, payment_methods)
+
+    def sale_keys(self, by: str) -> "np.ndarray":
+        return {
+            "user": self.sale_user,
+            "payment": self.sale_payment,
+            "hour": self.sale_hour,
+            "weekday": self.sale_weekday,
+        }[by]
+
+    def key_label(self, by: str, key: int) -> str:
+        return self.payment_methods[key] if by == "payment" else str(key)
+
+
+def local_hour_and_weekday(timestamps: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """Hour of day and weekday (0 = Monday) in the report timezone."""
+    # Convert each distinct UTC hour once, then broadcast back
+    utc_hours, inverse = np.unique(np.floor(timestamps / 3600).astype(np.int64), return_inverse=True)
+    moments = [datetime.fromtimestamp(hour * 3600, report_tz) for hour in utc_hours.tolist()]
+    hours = np.array([moment.hour for moment in moments], dtype=np.int64)
+    weekdays = np.array([moment.weekday() for moment in moments], dtype=np.int64)
+    return hours[inverse], weekdays[inverse]
+
+
+def group_by(frame: SalesFrame, by: str, metric: str) -> List[Tuple[str, float]]:
+    """`metric` per value of `by`, highest first."""
+    if by in LINE_DIMENSIONS:
+        keys = frame.product if by == "product" else frame.category
+        mask = keys >= 0
+        keys = keys[mask]
+        if metric == "sales":
+            # Count each sale once per key
+            pairs = np.unique(np.stack([keys, frame.sale_id[mask]]), axis=1)
+            keys, weights = pairs[0], None
+        else:
+            weights = (frame.line_total if metric == "total" else frame.quantity)[mask]
+    else:
+        keys = frame.sale_keys(by)
+        mask = keys >= 0
+        keys = keys[mask]
+        weights = None if metric == "sales" else (frame.sale_total if metric == "total" else frame.sale_quantity)[mask]
+
+    values, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=weights, minlength=len(values))
+    order = np.lexsort((values, -sums))
+    return [(frame.key_label(by, int(values[i])), float(sums[i])) for i in order]
+
+
+def ticket_stats(frame: SalesFrame, percentiles: List[float]) -> Tuple[int, float, Dict[str, float]]:
+    """Ticket count, mean ticket and ticket percentiles."""
+    if not len(frame):
+        return 0, 0.0, {}
+    results = np.percentile(frame.sale_total, percentiles)
+    return (
+        len(frame),
+        round(float(frame.sale_total.mean()), 2),
+        {f"p{q:g}": round(float(value), 2) for q, value in zip(percentiles, results)},
+    )
+
+
+def top_per_hour(frame: SalesFrame, n: int, metric: str) -> Dict[int, List[Tuple[str, float]]]:
+    """The `n` best products of each hour of the day."""
+    mask = frame.product >= 0
+    products, product_index = np.unique(frame.product[mask], return_inverse=True)
+    if not len(products):
+        return {}
+    hours = frame.sale_hour[frame.line_sale[mask]]
+    if metric == "sales":
+        cells = np.unique(np.stack([hours * len(products) + product_index, frame.sale_id[mask]]), axis=1)[0]
+        weights = None
+    else:
+        cells = hours * len(products) + product_index
+        weights = (frame.line_total if metric == "total" else frame.quantity)[mask]
+    grid = np.bincount(cells, weights=weights, minlength=24 * len(products)).reshape(24, len(products))
+
+    top = np.argsort(-grid, axis=1, kind="stable")[:, :n]
+    result = {}
+    for hour in np.flatnonzero(grid.sum(axis=1)):
+        result[int(hour)] = [
+            (str(products[i]), float(grid[hour, i])) for i in top[hour] if grid[hour, i] > 0
+        ]
+    return result
+
+
+def top_pairs(frame: SalesFrame, limit: int) -> List[Tuple[str, str, int]]:
+    """Product pairs bought together in the most tickets."""
+    mask = frame.product >= 0
+    # Distinct (sale, product) entries, grouped by sale
+    pairs = np.unique(np.stack([frame.sale_id[mask], frame.product[mask]]), axis=1)
+    sales, products = pairs
+    if not len(products):
+        return []
+    starts = np.flatnonzero(np.r_[True, sales[1:] != sales[:-1]])
+    sizes = np.diff(np.r_[starts, len(sales)])
+    # Each entry pairs with the entries after it in the same sale
+    position_in_sale = np.arange(len(sales)) - np.repeat(starts, sizes)
+    partners = np.repeat(sizes, sizes) - position_in_sale - 1
+    total = int(partners.sum())
+    if not total:
+        return []
+    left = np.repeat(np.arange(len(sales)), partners)
+    offsets = np.arange(total) - np.repeat(np.cumsum(partners) - partners, partners)
+    right = left + 1 + offsets
+
+    span = int(products.max()) + 1
+    codes, counts = np.unique(products[left] * span + products[right], return_counts=True)
+    order = np.lexsort((codes, -counts))[:limit]
+    return [(str(codes[i] // span), str(codes[i] % span), int(counts[i])) for i in order]
+
+
+def watermark_query(tenant_id: str):
+    return select(
+        select(func.max(Sale.id)).where(Sale.tenant_id == tenant_id).scalar_subquery(),
+        select(func.coalesce(func.sum(RunningTotal.sales_count), 0)).where(RunningTotal.tenant_id == tenant_id).scalar_subquery(),
+        select(func.max(CashClosing.id)).where(CashClosing.tenant_id == tenant_id).scalar_subquery(),
+    )
+
+
+async def watermark(db: AsyncSession, tenant_id: str) -> Tuple:
+    """Changes whenever a sale is created or settled, or a closing is made."""
+    result = await db.execute(watermark_query(tenant_id))
+    return tuple(result.one())
+
+
+class AnalyticsCache:
+    """Small LRU of computed results, valid while the tenant's watermark holds."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._results: "OrderedDict[Hashable, Tuple[Tuple, object]]" = OrderedDict()
+
+    def get(self, key: Hashable, mark: Tuple):
+        cached = self._results.get(key)
+        if cached is None or cached[0] != mark:
+            return None
+        self._results.move_to_end(key)
+        return cached[1]
+
+    def set(self, key: Hashable, mark: Tuple, value) -> None:
+        if self.size <= 0:
+            return
+        self._results[key] = (mark, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+
+analytics_cache = AnalyticsCache(settings.analytics_cache_size)
+
+
+async def run_analysis(
+    db: AsyncSession,
+    tenant_id: str,
+    date_from: float | None,
+    date_to: float | None,
+    query: Tuple,
+    compute,
+):
+    """Cached `compute(frame)` over the tenant's sales in the range."""
+    require_numpy()
+    mark = await watermark(db, tenant_id)
+    key = (tenant_id, date_from, date_to, query)
+    cached = analytics_cache.get(key, mark)
+    if cached is not None:
+        return cached
+    frame = await SalesFrame.load(db, tenant_id, date_from, date_to)
+    result = await asyncio.to_thread(compute, frame)
+    analytics_cache.set(key, mark, result)
+    return result
@@ -0,0 +1,262 @@
+"""
+Columnar history export.
+
+Writes non-open sales (live and archived), their lines and the cash
+closings as zstd-compressed Parquet files, one directory per tenant and
+month (in `settings.report_timezone`):
+
+    {export_dir}/tenant={tenant_id}/month=YYYY-MM/{sales,sale_lines,cash_closings}.parquet
+
+Rows are read from `app.db.engine`, or the tenant's shard, with server-side
+cursors in `EXPORT_BATCH_SIZE` batches, ordered so that each partition is
+written in one pass, and each file replaces the previous export of its
+partition when complete. The CLI exports one tenant, or all of them from
+the main database and every shard:
+
+    python -m app.reports.columnar [--tenant TENANT_ID] [--month YYYY-MM] [--out DIR]
+
+pyarrow is listed in requirements.txt; an install without it still boots,
+and the export answers 501.
+"""
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import Integer, cast, null, union_all
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.future import select
+
+from .rollups import report_tz
+from ..cash_closing.models import ArchivedSale, ArchivedSaleLine, CashClosing
+from ..config import settings
+from ..core.sharding import shard_router, tenant_engine
+from ..db import engine
+from ..sales.models import Sale, SaleLine
+# Models referenced by the sales relationships
+from ..auth import models as _auth_models  # noqa: F401
+from ..tables import models as _tables_models  # noqa: F401
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency
+    pa = pq = None
+
+EXPORT_BATCH_SIZE = 10000
+
+SALE_COLUMNS = (
+    "id", "tenant_id", "created_at", "status", "payment_method", "total",
+    "table_id", "name", "user_id", "closed_by_id",
+)
+LINE_COLUMNS = ("id", "sale_id", "product_id", "quantity", "price_unit", "line_total")
+
+
+def arrow_schemas() -> Dict[str, "pa.Schema"]:
+    sales = pa.schema([
+        ("id", pa.int64()), ("tenant_id", pa.string()), ("created_at", pa.float64()), ("status", pa.string()),
+        ("payment_method", pa.string()), ("total", pa.float64()), ("table_id", pa.int64()), ("name", pa.string()),
+        ("user_id", pa.int64()), ("closed_by_id", pa.int64()), ("closing_id", pa.int64()),
+    ])
+    lines = pa.schema([
+        ("id", pa.int64()), ("sale_id", pa.int64()), ("product_id", pa.int64()), ("quantity", pa.int64()),
+        ("price_unit", pa.float64()), ("line_total", pa.float64()), ("closing_id", pa.int64()),
+        ("tenant_id", pa.string()), ("created_at", pa.float64()),
+    ])
+    closings = pa.schema([
+        ("id", pa.int64()), ("tenant_id", pa.string()), ("closing_type", pa.string()), ("user_id", pa.int64()),
+        ("date", pa.float64()), ("from_date", pa.float64()), ("to_date", pa.float64()),
+        ("from_sales", pa.int64()), ("to_sales", pa.int64()), ("total_sales", pa.int64()),
+        ("total_cash", pa.float64()), ("total_card", pa.float64()), ("total_total", pa.float64()),
+        ("totals_by_method", pa.string()),
+    ])
+    return {"sales": sales, "sale_lines": lines, "cash_closings": closings}
+
+
+def month_range(month: str) -> Tuple[float, float]:
+    """Start and end timestamps of a YYYY-MM month in the report timezone."""
+    start = datetime.strptime(month, "%Y-%m").replace(tzinfo=report_tz)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start.timestamp(), end.timestamp()
+
+
+def month_of(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, report_tz).strftime("%Y-%m")
+
+
+def sales_query(tenant_id: str | None, period: Tuple[float, float] | None):
+    sources = []
+    for model, closing_id in ((ArchivedSale, ArchivedSale.closing_id), (Sale, cast(null(), Integer))):
+        query = select(*(getattr(model, column) for column in SALE_COLUMNS), closing_id.label("closing_id")).where(
+            model.status != "OPEN"
+        )
+        if tenant_id is not None:
+            query = query.where(model.tenant_id == tenant_id)
+        if period is not None:
+            query = query.where(model.created_at >= period[0], model.created_at < period[1])
+        sources.append(query)
+    union = union_all(*sources).subquery()
+    return select(union).order_by(union.c.tenant_id, union.c.created_at, union.c.id)
+
+
+def lines_query(tenant_id: str | None, period: Tuple[float, float] | None):
+    sources = []
+    for sale_model, line_model, closing_id in (
+        (ArchivedSale, ArchivedSaleLine, ArchivedSaleLine.closing_id),
+        (Sale, SaleLine, cast(null(), Integer)),
+    ):
+        query = (
+            select(
+                *(getattr(line_model, column) for column in LINE_COLUMNS),
+                closing_id.label("closing_id"), sale_model.tenant_id, sale_model.created_at,
+            )
+            .join(sale_model, sale_model.id == line_model.sale_id)
+            .where(sale_model.status != "OPEN")
+        )
+        if tenant_id is not None:
+            query = query.where(sale_model.tenant_id == tenant_id)
+        if period is not None:
+            query = query.where(sale_model.created_at >= period[0], sale_model.created_at < period[1])
+        sources.append(query)
+    union = union_all(*sources).subquery()
+    return select(union).order_by(union.c.tenant_id, union.c.created_at, union.c.sale_id, union.c.id)
+
+
+def closings_query(tenant_id: str | None, period: Tuple[float, float] | None):
+    query = select(
+        CashClosing.id, CashClosing.tenant_id, CashClosing.closing_type, CashClosing.user_id,
+        CashClosing.date, CashClosing.from_date, CashClosing.to_date,
+        CashClosing.from_sales, CashClosing.to_sales, CashClosing.total_sales,
+        CashClosing.total_cash, CashClosing.total_card, CashClosing.total_total,
+        CashClosing.totals_by_method,
+    ).order_by(CashClosing.tenant_id, CashClosing.date, CashClosing.id)
+    if tenant_id is not None:
+        query = query.where(CashClosing.tenant_id == tenant_id)
+    if period is not None:
+        query = query.where(CashClosing.date >= period[0], CashClosing.date < period[1])
+    return query
+
+
+class PartitionWriter:
+    """Writes one table's rows, switching file whenever the partition changes."""
+
+    def __init__(self, out_dir: str, table: str, schema: "pa.Schema", time_column: str):
+        self.out_dir = out_dir
+        self.table = table
+        self.schema = schema
+        self.time_column = time_column
+        self.partition: Tuple[str, str] | None = None
+        self.writer = None
+        self.path = self.tmp_path = None
+        self.rows = 0
+        self.written: List[dict] = []
+
+    def write(self, rows: List) -> None:
+        """Write a batch of rows ordered by tenant and time."""
+        start = 0
+        tenant_index = self.schema.names.index("tenant_id")
+        time_index = self.schema.names.index(self.time_column)
+        for position, row in enumerate(rows):
+            partition = (row[tenant_index], month_of(row[time_index] or 0))
+            if partition != self.partition:
+                self._append(rows[start:position])
+                start = position
+                self._open(partition)
+        self._append(rows[start:])
+
+    def _open(self, partition: Tuple[str, str]) -> None:
+        self.close()
+        self.partition = partition
+        directory = os.path.join(
+            self.out_dir, f"tenant={quote(partition[0], safe='')}", f"month={partition[1]}"
+        )
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{self.table}.parquet")
+        self.tmp_path = self.path + ".tmp"
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression="zstd")
+
+    def _append(self, rows: List) -> None:
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        if "totals_by_method" in self.schema.names:
+            index = self.schema.names.index("totals_by_method")
+            columns[index] = [
+                value if value is None or isinstance(value, str) else json.dumps(value) for value in columns[index]
+            ]
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self.writer is None:
+            return
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+        self.written.append({
+            "tenant_id": self.partition[0], "month": self.partition[1], "table": self.table,
+            "path": self.path, "rows": self.rows,
+        })
+        self.writer = None
+        self.rows = 0
+
+
+async def export_history(
+    out_dir: str,
+    tenant_id: str | None = None,
+    month: str | None = None,
+    bind: AsyncEngine = engine,
+) -> List[dict]:
+    """Export sales, lines and closings; returns the files written with their row counts."""
+    if pa is None:
+        raise RuntimeError("La exportación columnar requiere pyarrow")
+    period = month_range(month) if month else None
+    if tenant_id is not None:
+        bind = await tenant_engine(tenant_id, bind)
+    schemas = arrow_schemas()
+    written = []
+    for table, query, time_column in (
+        ("sales", sales_query(tenant_id, period), "created_at"),
+        ("sale_lines", lines_query(tenant_id, period), "created_at"),
+        ("cash_closings", closings_query(tenant_id, period), "date"),
+    ):
+        writer = PartitionWriter(out_dir, table, schemas[table], time_column)
+        async with bind.connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                # Align columns with the schema order
+                await asyncio.to_thread(writer.write, [tuple(row._mapping[name] for name in schemas[table].names) for row in rows])
+        writer.close()
+        written.extend(writer.written)
+    return written
+
+
+async def main(out_dir: str, tenant_id: str | None, month: str | None) -> None:
+    try:
+        if tenant_id is not None:
+            written = await export_history(out_dir, tenant_id, month)
+        else:
+            # Tenants never span databases, so their partitions do not overlap
+            written = []
+            for shard in shard_router.names:
+                written.extend(await export_history(out_dir, None, month, bind=shard_router.engine(shard)))
+    finally:
+        await shard_router.dispose()
+        await engine.dispose()
+    for entry in written:
+        print(f"{entry['path']}: {entry['rows']} rows")
+    print(f"{len(written)} files written")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the sales history as Parquet files.")
+    parser.add_argument("--tenant", help="Only export this tenant (default: all)")
+    parser.add_argument("--month", help="Only export this month, YYYY-MM (default: all)")
+    parser.add_argument("--out", default=settings.export_dir, help="Output directory")
+    args = parser.parse_args()
+    asyncio.run(main(args.out, args.tenant, args.month))
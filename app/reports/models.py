@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, String
+
+from ..db import Base
+
+
+class SalesRollup(Base):
+    """Settled sales pre-aggregated per time bucket and dimension value."""
+
+    __tablename__ = "sales_rollups"
+
+    tenant_id = Column(String, primary_key=True)
+    granularity = Column(String(4), primary_key=True) # day / hour
+    bucket = Column(Float, primary_key=True) # Timestamp of the bucket start
+    dimension = Column(String(8), primary_key=True) # product / category / user / payment
+    key = Column(String, primary_key=True) # Product, category or user id, or payment method
+
+    sales_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,42 @@
+"""
+Rebuild the sales rollups from the live and archived sales.
+
+    python -m app.reports.rebuild [--tenant TENANT_ID]
+
+Without `--tenant` the main database and every shard are rebuilt.
+"""
+import argparse
+import asyncio
+
+from ..core.sharding import bind_shard, bind_tenant, shard_router
+from ..db import SessionLocal, engine
+from .rollups import rebuild_rollups
+# Models referenced by the sales relationships
+from ..auth import models as _auth_models  # noqa: F401
+from ..tables import models as _tables_models  # noqa: F401
+
+
+async def main(tenant_id: str | None) -> None:
+    try:
+        if tenant_id is not None:
+            async with SessionLocal() as db:
+                await bind_tenant(db, tenant_id)
+                processed = await rebuild_rollups(db, tenant_id)
+        else:
+            # Every database holds the sales and rollups of its own tenants
+            processed = 0
+            for shard in shard_router.names:
+                async with SessionLocal() as db:
+                    bind_shard(db, shard)
+                    processed += await rebuild_rollups(db)
+    finally:
+        await shard_router.dispose()
+        await engine.dispose()
+    print(f"Rollups rebuilt from {processed} sales")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenant", help="Only rebuild this tenant (default: all)")
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant))
@@ -0,0 +1,193 @@
+"""
+Sales rollups.
+
+Every settled sale adds to one row per (granularity, bucket, dimension, key):
+its day and hour, crossed with each product and category it contains, the
+user who charged it and its payment method. `record_sale_rollups` applies a
+single sale inside the transaction that settles it; `rebuild_rollups`
+recomputes everything from the live and archived sales. Both go through the
+same additive upsert, so partial aggregates can be flushed at any time.
+
+Buckets follow `settings.report_timezone`. Categories are those of the
+products at the time of the update (or of the rebuild).
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import SalesRollup
+from ..cash_closing.models import ArchivedSale, ArchivedSaleLine
+from ..cash_closing.service import EXCLUDED_STATUSES
+from ..config import settings
+from ..db import dialect_insert
+from ..products.models import Product
+from ..sales.models import Sale, SaleLine
+
+GRANULARITIES = ("day", "hour")
+DIMENSIONS = ("product", "category", "user", "payment")
+
+REBUILD_BATCH_SIZE = 1000
+FLUSH_ROWS = 50000
+
+report_tz = ZoneInfo(settings.report_timezone)
+
+RollupKey = Tuple[str, str, float, str, str]
+
+
+def bucket_start(timestamp: float, granularity: str) -> float:
+    moment = datetime.fromtimestamp(timestamp, report_tz).replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment.timestamp()
+
+
+class RollupBuilder:
+    """Accumulates sales into rollup rows in memory."""
+
+    def __init__(self):
+        self.rows: Dict[RollupKey, List] = {}
+
+    def _add(self, key: RollupKey, quantity: int, total: float) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            self.rows[key] = [1, quantity, total]
+        else:
+            row[0] += 1
+            row[1] += quantity
+            row[2] += total
+
+    def add_sale(
+        self,
+        tenant_id: str,
+        created_at: float,
+        payment_method: str | None,
+        user_id: int | None,
+        total: float,
+        lines: Iterable[Tuple[int, int | None, int, float]],
+    ) -> None:
+        """Add one sale; `lines` are (product_id, category_id, quantity, line_total)."""
+        by_product: Dict[str, List] = {}
+        by_category: Dict[str, List] = {}
+        quantity = 0
+        for product_id, category_id, line_quantity, line_total in lines:
+            quantity += line_quantity
+            for values, key in ((by_product, product_id), (by_category, category_id)):
+                if key is None:
+                    continue
+                acc = values.setdefault(str(key), [0, 0.0])
+                acc[0] += line_quantity
+                acc[1] += line_total
+
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(created_at, granularity)
+            prefix = (tenant_id, granularity, bucket)
+            self._add((*prefix, "payment", payment_method or "cash"), quantity, total)
+            if user_id is not None:
+                self._add((*prefix, "user", str(user_id)), quantity, total)
+            for key, (line_quantity, line_total) in by_product.items():
+                self._add((*prefix, "product", key), line_quantity, line_total)
+            for key, (line_quantity, line_total) in by_category.items():
+                self._add((*prefix, "category", key), line_quantity, line_total)
+
+    async def flush(self, db: AsyncSession) -> None:
+        """Add the accumulated rows to the table, in primary key order."""
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, {}
+        values = [
+            {
+                "tenant_id": key[0], "granularity": key[1], "bucket": key[2], "dimension": key[3], "key": key[4],
+                "sales_count": sales_count, "quantity": quantity, "total": total,
+            }
+            for key, (sales_count, quantity, total) in sorted(rows.items())
+        ]
+        insert = dialect_insert(db)
+        for start in range(0, len(values), REBUILD_BATCH_SIZE):
+            stmt = insert(SalesRollup).values(values[start:start + REBUILD_BATCH_SIZE])
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[
+                        SalesRollup.tenant_id, SalesRollup.granularity, SalesRollup.bucket,
+                        SalesRollup.dimension, SalesRollup.key,
+                    ],
+                    set_={
+                        "sales_count": SalesRollup.sales_count + stmt.excluded.sales_count,
+                        "quantity": SalesRollup.quantity + stmt.excluded.quantity,
+                        "total": SalesRollup.total + stmt.excluded.total,
+                    },
+                )
+            )
+
+
+async def record_sale_rollups(db: AsyncSession, sale: Sale) -> None:
+    """Add a sale that was just settled to the rollups; the caller commits."""
+    result = await db.execute(
+        select(SaleLine.product_id, Product.category_id, SaleLine.quantity, SaleLine.line_total)
+        .outerjoin(Product, Product.id == SaleLine.product_id)
+        .where(SaleLine.sale_id == sale.id)
+    )
+    builder = RollupBuilder()
+    builder.add_sale(
+        sale.tenant_id, sale.created_at, sale.payment_method,
+        sale.closed_by_id or sale.user_id, sale.total, result.all(),
+    )
+    await builder.flush(db)
+
+
+def history_query(sale_model, line_model, tenant_id: str | None):
+    """Settled sales of one source joined to their lines, ordered by sale."""
+    query = (
+        select(
+            sale_model.id, sale_model.tenant_id, sale_model.created_at, sale_model.payment_method,
+            func.coalesce(sale_model.closed_by_id, sale_model.user_id), sale_model.total,
+            line_model.product_id, Product.category_id, line_model.quantity, line_model.line_total,
+        )
+        .select_from(sale_model)
+        .outerjoin(line_model, line_model.sale_id == sale_model.id)
+        .outerjoin(Product, Product.id == line_model.product_id)
+        .where(sale_model.status.notin_(EXCLUDED_STATUSES))
+        .order_by(sale_model.id)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    if tenant_id is not None:
+        query = query.where(sale_model.tenant_id == tenant_id)
+    return query
+
+
+async def rebuild_rollups(db: AsyncSession, tenant_id: str | None = None) -> int:
+    """
+    Recompute the rollups of one tenant (or all) from live and archived sales.
+
+    Streams the history in batches and commits at the end; returns the number
+    of sales processed. Run it while the tenant is not selling.
+    """
+    stmt = delete(SalesRollup)
+    if tenant_id is not None:
+        stmt = stmt.where(SalesRollup.tenant_id == tenant_id)
+    await db.execute(stmt)
+
+    builder = RollupBuilder()
+    processed = 0
+    for sale_model, line_model in ((ArchivedSale, ArchivedSaleLine), (Sale, SaleLine)):
+        result = await db.stream(history_query(sale_model, line_model, tenant_id))
+        current, lines = None, []
+        async for rows in result.partitions():
+            for row in rows:
+                if current is not None and row[0] != current[0]:
+                    builder.add_sale(*current[1:6], lines)
+                    processed += 1
+                    current, lines = None, []
+                current = current or row
+                if row[6] is not None:
+                    lines.append(row[6:])
+            if len(builder.rows) >= FLUSH_ROWS:
+                await builder.flush(db)
+        if current is not None:
+            builder.add_sale(*current[1:6], lines)
+            processed += 1
+    await builder.flush(db)
+    await db.commit()
+    return processed
@@ -0,0 +1,223 @@
+from typing import Dict, Iterable, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .models import SalesRollup
+from .schemas import RollupPoint, RollupTotal, AnalyticsValue, TicketStats, HourTop, ProductPair, ExportedFile
+from .analytics import run_analysis, group_by, ticket_stats, top_per_hour, top_pairs
+from .columnar import export_history
+from ..config import settings
+from ..db import get_read_session, read_engine
+from ..auth.dependencies import get_current_user
+from ..auth.models import User
+from ..products.models import Product, Category
+
+router = APIRouter()
+
+DIMENSION_PATTERN = "^(product|category|user|payment)$"
+GRANULARITY_PATTERN = "^(day|hour)$"
+ANALYTICS_DIMENSION_PATTERN = "^(product|category|user|payment|hour|weekday)$"
+METRIC_PATTERN = "^(total|quantity|sales)$"
+
+LABEL_SOURCES = {
+    "product": (Product.id, Product.name, Product.tenant_id),
+    "category": (Category.id, Category.name, Category.tenant_id),
+    "user": (User.id, User.username, User.tenant_id),
+}
+
+
+async def load_labels(db: AsyncSession, tenant_id: str, dimension: str, keys: Iterable[str]) -> Dict[str, str]:
+    """Names for the keys of a dimension, in one query."""
+    if dimension not in LABEL_SOURCES:
+        return {}
+    ids = {int(key) for key in keys}
+    if not ids:
+        return {}
+    id_column, name_column, tenant_column = LABEL_SOURCES[dimension]
+    result = await db.execute(select(id_column, name_column).where(id_column.in_(ids), tenant_column == tenant_id))
+    return {str(row_id): name for row_id, name in result.all()}
+
+
+def rollup_filter(tenant_id: str, dimension: str, granularity: str, date_from: float | None, date_to: float | None):
+    criteria = [
+        SalesRollup.tenant_id == tenant_id,
+        SalesRollup.granularity == granularity,
+        SalesRollup.dimension == dimension,
+    ]
+    if date_from is not None:
+        criteria.append(SalesRollup.bucket >= date_from)
+    if date_to is not None:
+        criteria.append(SalesRollup.bucket < date_to)
+    return criteria
+
+
+@router.get("/sales", response_model=List[RollupPoint])
+async def sales_series(
+    dimension: str = Query("payment", pattern=DIMENSION_PATTERN),
+    granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Figures per day or hour and dimension value, read from the rollups."""
+    result = await db.execute(
+        select(SalesRollup.bucket, SalesRollup.key, SalesRollup.sales_count, SalesRollup.quantity, SalesRollup.total)
+        .where(*rollup_filter(current_user.tenant_id, dimension, granularity, date_from, date_to))
+        .order_by(SalesRollup.bucket, SalesRollup.key)
+    )
+    rows = result.all()
+    labels = await load_labels(db, current_user.tenant_id, dimension, {row.key for row in rows})
+    return [
+        RollupPoint(
+            bucket=row.bucket, key=row.key, label=labels.get(row.key),
+            sales_count=row.sales_count, quantity=row.quantity, total=row.total,
+        )
+        for row in rows
+    ]
+
+
+@router.get("/top", response_model=List[RollupTotal])
+async def top_values(
+    dimension: str = Query("product", pattern=DIMENSION_PATTERN),
+    granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    limit: int = Query(10, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Dimension values ranked by total over the range, read from the rollups."""
+    total = func.sum(SalesRollup.total).label("total")
+    result = await db.execute(
+        select(
+            SalesRollup.key,
+            func.sum(SalesRollup.sales_count).label("sales_count"),
+            func.sum(SalesRollup.quantity).label("quantity"),
+            total,
+        )
+        .where(*rollup_filter(current_user.tenant_id, dimension, granularity, date_from, date_to))
+        .group_by(SalesRollup.key)
+        .order_by(total.desc(), SalesRollup.key)
+        .limit(limit)
+    )
+    rows = result.all()
+    labels = await load_labels(db, current_user.tenant_id, dimension, {row.key for row in rows})
+    return [
+        RollupTotal(
+            key=row.key, label=labels.get(row.key),
+            sales_count=row.sales_count, quantity=row.quantity, total=row.total,
+        )
+        for row in rows
+    ]
+
+
+def require_admin(current_user: User) -> None:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores pueden consultar análisis o exportar")
+
+
+@router.get("/analytics/group-by", response_model=List[AnalyticsValue])
+async def analytics_group_by(
+    by: str = Query("product", pattern=ANALYTICS_DIMENSION_PATTERN),
+    metric: str = Query("total", pattern=METRIC_PATTERN),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Total, units or tickets per product, category, user, payment method, hour or weekday."""
+    require_admin(current_user)
+    rows = await run_analysis(
+        db, current_user.tenant_id, date_from, date_to, ("group_by", by, metric),
+        lambda frame: group_by(frame, by, metric),
+    )
+    rows = rows[:limit]
+    labels = await load_labels(db, current_user.tenant_id, by, (key for key, _ in rows))
+    return [AnalyticsValue(key=key, label=labels.get(key), value=value) for key, value in rows]
+
+
+@router.get("/analytics/tickets", response_model=TicketStats)
+async def analytics_tickets(
+    q: List[float] = Query([50, 90, 99]),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Ticket count, mean and percentiles of the ticket total."""
+    require_admin(current_user)
+    if any(value < 0 or value > 100 for value in q):
+        raise HTTPException(status_code=400, detail="Los percentiles deben estar entre 0 y 100")
+    sales, mean, percentiles = await run_analysis(
+        db, current_user.tenant_id, date_from, date_to, ("tickets", tuple(q)),
+        lambda frame: ticket_stats(frame, q),
+    )
+    return TicketStats(sales=sales, mean=mean, percentiles=percentiles)
+
+
+@router.get("/analytics/top-per-hour", response_model=List[HourTop])
+async def analytics_top_per_hour(
+    n: int = Query(3, ge=1, le=50),
+    metric: str = Query("quantity", pattern=METRIC_PATTERN),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """The best products of each hour of the day."""
+    require_admin(current_user)
+    by_hour = await run_analysis(
+        db, current_user.tenant_id, date_from, date_to, ("top_per_hour", n, metric),
+        lambda frame: top_per_hour(frame, n, metric),
+    )
+    labels = await load_labels(
+        db, current_user.tenant_id, "product", {key for items in by_hour.values() for key, _ in items}
+    )
+    return [
+        HourTop(hour=hour, items=[AnalyticsValue(key=key, label=labels.get(key), value=value) for key, value in items])
+        for hour, items in sorted(by_hour.items())
+    ]
+
+
+@router.get("/analytics/pairs", response_model=List[ProductPair])
+async def analytics_pairs(
+    limit: int = Query(10, ge=1, le=200),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Products most often bought together (basket analysis)."""
+    require_admin(current_user)
+    pairs = await run_analysis(
+        db, current_user.tenant_id, date_from, date_to, ("pairs", limit),
+        lambda frame: top_pairs(frame, limit),
+    )
+    labels = await load_labels(db, current_user.tenant_id, "product", {key for a, b, _ in pairs for key in (a, b)})
+    return [
+        ProductPair(
+            product_a=AnalyticsValue(key=a, label=labels.get(a), value=count),
+            product_b=AnalyticsValue(key=b, label=labels.get(b), value=count),
+        )
+        for a, b, count in pairs
+    ]
+
+
+@router.post("/export/columnar", response_model=List[ExportedFile])
+async def export_columnar(
+    month: str | None = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Write the tenant's history as Parquet files under the export directory."""
+    require_admin(current_user)
+    try:
+        return await export_history(settings.export_dir, current_user.tenant_id, month, bind=read_engine)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Mes no válido")
@@ -0,0 +1,45 @@
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class RollupTotal(BaseModel):
+    key: str  # Product, category or user id, or payment method
+    label: str | None = None  # Its name, when it still exists
+    sales_count: int
+    quantity: int
+    total: float
+
+
+class RollupPoint(RollupTotal):
+    bucket: float  # Timestamp of the day/hour start
+
+
+class AnalyticsValue(BaseModel):
+    key: str
+    label: str | None = None
+    value: float
+
+
+class TicketStats(BaseModel):
+    sales: int
+    mean: float
+    percentiles: Dict[str, float]  # e.g. {"p50": 12.5}
+
+
+class HourTop(BaseModel):
+    hour: int  # 0-23 in the report timezone
+    items: List[AnalyticsValue]
+
+
+class ProductPair(BaseModel):
+    product_a: AnalyticsValue
+    product_b: AnalyticsValue  # value: tickets with both products
+
+
+class ExportedFile(BaseModel):
+    tenant_id: str
+    month: str  # YYYY-MM
+    table: str  # sales / sale_lines / cash_closings
+    path: str
+    rows: int
@@ -0,0 +1,91 @@
+"""
+Sales export module.
+
+Streams a tenant's sales and their lines as NDJSON or CSV without
+materializing ORM objects: rows come from a server-side cursor in
+`EXPORT_BATCH_SIZE` batches and are written out batch by batch.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .models import Sale, SaleLine
+from ..products.models import Product
+
+EXPORT_BATCH_SIZE = 1000
+
+SALE_FIELDS = ["id", "created_at", "status", "payment_method", "total", "table_id", "name", "user_id", "closed_by_id"]
+LINE_FIELDS = ["line_id", "product_id", "product_name", "sku", "quantity", "price_unit", "line_total"]
+
+
+def export_query(
+    tenant_id: str,
+    date_from: float | None = None,
+    date_to: float | None = None,
+    sale_status: str | None = None,
+):
+    """One row per sale line (or per sale without lines), ordered by sale."""
+    query = (
+        select(
+            Sale.id, Sale.created_at, Sale.status, Sale.payment_method, Sale.total,
+            Sale.table_id, Sale.name, Sale.user_id, Sale.closed_by_id,
+            SaleLine.id.label("line_id"), SaleLine.product_id,
+            Product.name.label("product_name"), Product.sku,
+            SaleLine.quantity, SaleLine.price_unit, SaleLine.line_total,
+        )
+        .select_from(Sale)
+        .outerjoin(SaleLine, SaleLine.sale_id == Sale.id)
+        .outerjoin(Product, Product.id == SaleLine.product_id)
+        .where(Sale.tenant_id == tenant_id)
+        .order_by(Sale.id, SaleLine.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if date_from is not None:
+        query = query.where(Sale.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(Sale.created_at < date_to)
+    if sale_status:
+        query = query.where(Sale.status == sale_status)
+    return query
+
+
+async def stream_ndjson(db: AsyncSession, query) -> AsyncIterator[str]:
+    """Yield one JSON document per sale, with its lines nested."""
+    result = await db.stream(query)
+    current = None
+    async for rows in result.partitions():
+        chunk = []
+        for row in rows:
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    chunk.append(json.dumps(current))
+                current = {field: getattr(row, field) for field in SALE_FIELDS}
+                current["lines"] = []
+            if row.line_id is not None:
+                current["lines"].append({field: getattr(row, field) for field in LINE_FIELDS})
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+    if current is not None:
+        yield json.dumps(current) + "\n"
+
+
+async def stream_csv(db: AsyncSession, query) -> AsyncIterator[str]:
+    """Yield a CSV with one row per sale line, sale columns repeated."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["sale_id"] + SALE_FIELDS[1:] + LINE_FIELDS)
+    yield buffer.getvalue()
+
+    result = await db.stream(query)
+    async for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [getattr(row, field) for field in SALE_FIELDS + LINE_FIELDS]
+            for row in rows
+        )
+        yield buffer.getvalue()
@@ -1,6 +1,6 @@
 
 
-from sqlalchemy import Column, Integer, Float, String, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -35,13 +35,29 @@ class Sale(Base):
     creator = relationship("app.auth.models.User", foreign_keys=[user_id])
     closer = relationship("app.auth.models.User", foreign_keys=[closed_by_id])
 
+    __table_args__ = (
+        # Keyset pagination of the history, optionally filtered by status
+        Index("ix_sales_tenant_status_created_at", "tenant_id", "status", "created_at", "id"),
+        Index("ix_sales_tenant_created_at", "tenant_id", "created_at", "id"),
+        # Open account of a table
+        Index("ix_sales_tenant_table_status", "tenant_id", "table_id", "status"),
+        # At most one open account per table
+        Index(
+            "ux_sales_open_table", "tenant_id", "table_id", unique=True,
+            postgresql_where=text("status = 'OPEN'"), sqlite_where=text("status = 'OPEN'"),
+        ),
+        # Archived sales keep their ids: SQLite must never hand them out again
+        {"sqlite_autoincrement": True},
+    )
+
 
 class SaleLine(Base):
 
     __tablename__ = "sale_lines"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
 
     quantity = Column(Integer, nullable=False)
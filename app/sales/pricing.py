@@ -0,0 +1,131 @@
+"""
+Sales pricing module.
+
+Resolves the products referenced by incoming sale lines and prices them.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .models import Sale, SaleLine
+from .schemas import SaleLineCreate, SaleLineUpdate
+from ..products.models import Product
+
+
+async def resolve_products(
+    db: AsyncSession,
+    tenant_id: str,
+    lines_in: Iterable[SaleLineCreate],
+) -> Dict[int, Product]:
+    """
+    Fetch every product referenced by `lines_in` for the tenant in one query.
+
+    Raises a single 404 listing all the product ids that were not found.
+    """
+    product_ids = {line_in.product_id for line_in in lines_in}
+    if not product_ids:
+        return {}
+
+    result = await db.execute(
+        select(Product).where(Product.id.in_(product_ids), Product.tenant_id == tenant_id)
+    )
+    products = {product.id: product for product in result.scalars()}
+
+    missing = sorted(product_ids - products.keys())
+    if len(missing) == 1:
+        raise HTTPException(status_code=404, detail=f"Producto {missing[0]} no encontrado")
+    if missing:
+        ids = ", ".join(str(product_id) for product_id in missing)
+        raise HTTPException(status_code=404, detail=f"Productos {ids} no encontrados")
+
+    return products
+
+
+def build_lines(
+    lines_in: Iterable[SaleLineCreate],
+    products: Dict[int, Product],
+) -> Tuple[List[SaleLine], float]:
+    """Build priced `SaleLine` objects and return them with their total."""
+    lines = []
+    total = 0.0
+    for line_in in lines_in:
+        price_unit = products[line_in.product_id].price
+        line_total = price_unit * line_in.quantity
+        lines.append(SaleLine(
+            product_id=line_in.product_id,
+            quantity=line_in.quantity,
+            price_unit=price_unit,
+            line_total=line_total,
+        ))
+        total += line_total
+    return lines, total
+
+
+async def price_lines(
+    db: AsyncSession,
+    tenant_id: str,
+    lines_in: List[SaleLineCreate],
+) -> Tuple[List[SaleLine], float]:
+    """Resolve and price `lines_in` with a single product lookup."""
+    products = await resolve_products(db, tenant_id, lines_in)
+    return build_lines(lines_in, products)
+
+
+async def merge_lines(
+    db: AsyncSession,
+    sale: Sale,
+    lines_in: List[SaleLineUpdate],
+) -> None:
+    """
+    Merge `lines_in` into the already loaded `sale.lines`.
+
+    Incoming lines are matched to existing ones by line id when given and
+    otherwise by product. Matched lines only change when their quantity
+    does (keeping the price they were ordered at), unmatched incoming lines
+    are inserted and leftover existing lines are deleted. `sale.total` is
+    adjusted by the difference of each change.
+    """
+    existing_by_id = {line.id: line for line in sale.lines}
+
+    matched = {}
+    for line_in in lines_in:
+        if line_in.id is None:
+            continue
+        line = existing_by_id.pop(line_in.id, None)
+        if line is None or line.product_id != line_in.product_id:
+            raise HTTPException(status_code=404, detail=f"Línea {line_in.id} no encontrada en la cuenta")
+        matched[id(line_in)] = line
+
+    pending = []
+    for line_in in lines_in:
+        if line_in.id is not None:
+            continue
+        line = next(
+            (l for l in existing_by_id.values() if l.product_id == line_in.product_id),
+            None,
+        )
+        if line is None:
+            pending.append(line_in)
+        else:
+            matched[id(line_in)] = existing_by_id.pop(line.id)
+
+    # Price the inserts first so a missing product leaves the sale untouched
+    new_lines, total_added = await price_lines(db, sale.tenant_id, pending)
+
+    for line_in in lines_in:
+        line = matched.get(id(line_in))
+        if line is None or line.quantity == line_in.quantity:
+            continue
+        line_total = line.price_unit * line_in.quantity
+        sale.total += line_total - line.line_total
+        line.quantity = line_in.quantity
+        line.line_total = line_total
+
+    for line in existing_by_id.values():
+        sale.total -= line.line_total
+        sale.lines.remove(line)
+
+    sale.lines.extend(new_lines)
+    sale.total += total_added
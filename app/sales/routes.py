@@ -1,24 +1,140 @@
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import binascii
+import json
+from typing import List, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from sqlalchemy import insert, literal, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
 
 from .models import Sale, SaleLine
-from .schemas import SaleCreate, SaleOut, SaleOpen, SaleUpdate, SaleLineCreate
+from .schemas import (
+    SaleCreate, SaleOut, SaleOpen, SaleUpdate, SaleLineCreate, SaleCompactOut,
+    SaleSummaryOut, SalePage,
+)
+from .pricing import price_lines, merge_lines
+from .export import export_query, stream_csv, stream_ndjson
 from ..products.models import Product
-from ..auth.dependencies import get_current_user
+from ..auth.dependencies import get_current_user, get_current_user_from_query
+from ..core.events import broker, sse_stream
 from ..auth.models import User
-from ..db import get_session
+from ..db import get_session, get_read_session
 from ..tables.models import Table
+from ..cash_closing.service import record_sale
+from ..reports.rollups import record_sale_rollups
 
 router = APIRouter()
 
 
-@router.post("/", response_model=SaleOut, status_code=status.HTTP_201_CREATED)
+def compact_sale(sale: Sale, lines: List[SaleLine]) -> SaleCompactOut:
+    """Build the compact response from the objects already in the session."""
+    return SaleCompactOut(
+        id=sale.id,
+        total=sale.total,
+        payment_method=sale.payment_method,
+        status=sale.status,
+        table_id=sale.table_id,
+        line_ids=[line.id for line in lines],
+    )
+
+
+def sale_event(event_type: str, sale: Sale, **extra) -> dict:
+    """Board-level event payload: the sale header plus any line deltas."""
+    return {
+        "type": event_type,
+        "sale": {
+            "id": sale.id,
+            "total": sale.total,
+            "status": sale.status,
+            "table_id": sale.table_id,
+            "name": sale.name,
+        },
+        **extra,
+    }
+
+
+def line_payload(line: SaleLine) -> dict:
+    return {
+        "id": line.id,
+        "product_id": line.product_id,
+        "quantity": line.quantity,
+        "price_unit": line.price_unit,
+        "line_total": line.line_total,
+    }
+
+
+def encode_cursor(created_at: float, sale_id: int) -> str:
+    """Encode the `(created_at, id)` position of a sale as an opaque cursor."""
+    raw = json.dumps([created_at, sale_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        created_at, sale_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), int(sale_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+
+
+# Query builders of the hot routes, also checked by tests/test_query_plans.py
+
+def sale_query(sale_id: int, tenant_id: str):
+    return select(Sale).where(Sale.id == sale_id, Sale.tenant_id == tenant_id)
+
+
+def active_accounts_query(tenant_id: str):
+    return select(Sale).where(Sale.status == "OPEN", Sale.tenant_id == tenant_id).order_by(Sale.created_at.desc())
+
+
+def open_account_statement(values: dict):
+    """INSERT of an open account; with a table, only if the table is the tenant's."""
+    if not values["table_id"]:
+        return insert(Sale).values(**values)
+    # One statement: inserts only if the table is the tenant's, and the
+    # ux_sales_open_table index rejects a second open account
+    columns = Sale.__table__.c
+    source = select(*(
+        Table.id if name == "table_id" else literal(value, columns[name].type)
+        for name, value in values.items()
+    )).where(Table.id == values["table_id"], Table.tenant_id == values["tenant_id"])
+    return insert(Sale).from_select(list(values), source)
+
+
+def is_open_table_conflict(error: IntegrityError) -> bool:
+    """Whether the error is ux_sales_open_table rejecting a second open account."""
+    # PostgreSQL names the index, SQLite lists its columns
+    message = str(error.orig)
+    return "ux_sales_open_table" in message or "sales.tenant_id, sales.table_id" in message
+
+
+def history_query(tenant_id: str, limit: int, sale_status: str | None = None, position: Tuple[float, int] | None = None):
+    """Sale headers newest first, from the `(created_at, id)` keyset position."""
+    query = (
+        select(
+            Sale.id, Sale.total, Sale.payment_method, Sale.status,
+            Sale.created_at, Sale.table_id, Sale.name,
+        )
+        .where(Sale.tenant_id == tenant_id)
+        .order_by(Sale.created_at.desc(), Sale.id.desc())
+        .limit(limit)
+    )
+    if sale_status:
+        query = query.where(Sale.status == sale_status)
+    if position:
+        query = query.where(tuple_(Sale.created_at, Sale.id) < tuple_(*position))
+    return query
+
+
+@router.post("/", response_model=SaleOut | SaleCompactOut, status_code=status.HTTP_201_CREATED)
 async def create_sale(
     sale_in: SaleCreate,
+    compact: bool = False,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -27,8 +143,10 @@ async def create_sale(
         raise HTTPException(status_code=400, detail="La venta debe tener al menos una línea.")
 
 
+    lines, total = await price_lines(db, current_user.tenant_id, sale_in.lines)
+
     sale = Sale(
-        total=0.0,
+        total=total,
         payment_method=sale_in.payment_method,
         status="CLOSED",
         user_id=current_user.id,
@@ -37,30 +155,16 @@ async def create_sale(
     db.add(sale)
     await db.flush()
 
-    total = 0.0
-    for line_in in sale_in.lines:
-        result = await db.execute(select(Product).where(Product.id == line_in.product_id, Product.tenant_id == current_user.tenant_id))
-        product = result.scalar_one_or_none()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Producto {line_in.product_id} no encontrado")
-        
-        price_unit = product.price
-        line_total = price_unit * line_in.quantity
-        
-        sale_line = SaleLine(
-            sale_id=sale.id,
-            product_id=product.id,
-            quantity=line_in.quantity,
-            price_unit=price_unit,
-            line_total=line_total,
-        )
-        db.add(sale_line)
-        total += line_total
-    
-    sale.total = total
-    db.add(sale)
+    for sale_line in lines:
+        sale_line.sale_id = sale.id
+    db.add_all(lines)
+    await record_sale(db, sale)
+    await record_sale_rollups(db, sale)
     await db.commit()
-    
+
+    if compact:
+        return compact_sale(sale, lines)
+
     # Reload
     result = await db.execute(
         select(Sale)
@@ -74,41 +178,38 @@ async def create_sale(
     return result.unique().scalar_one()
 
 
-@router.post("/open", response_model=SaleOut, status_code=status.HTTP_201_CREATED)
+@router.post("/open", response_model=SaleOut | SaleCompactOut, status_code=status.HTTP_201_CREATED)
 async def open_account(
     account_in: SaleOpen,
+    compact: bool = False,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    # Check if table exists and is free if provided
-    if account_in.table_id:
-        # Check if table exists
-        t_res = await db.execute(select(Table).where(Table.id == account_in.table_id, Table.tenant_id == current_user.tenant_id))
-        table = t_res.scalar_one_or_none()
-        if not table:
-            raise HTTPException(status_code=404, detail="Mesa no encontrada")
-        
-        # Check if table already has an OPEN sale
-        open_res = await db.execute(
-            select(Sale)
-            .where(Sale.table_id == account_in.table_id)
-            .where(Sale.status == "OPEN")
-        )
-        if open_res.scalar_one_or_none():
-             raise HTTPException(status_code=400, detail="La mesa ya tiene una cuenta abierta")
-
-    sale = Sale(
-        total=0.0,
-        status="OPEN",
-        table_id=account_in.table_id,
-        name=account_in.name,
-        user_id=current_user.id,
-        tenant_id=current_user.tenant_id
-    )
-    db.add(sale)
+    values = {
+        "total": 0.0,
+        "status": "OPEN",
+        "table_id": account_in.table_id,
+        "name": account_in.name,
+        "user_id": current_user.id,
+        "tenant_id": current_user.tenant_id,
+        "created_at": datetime.now().timestamp(),
+    }
+    stmt = open_account_statement(values)
+    try:
+        sale = (await db.execute(stmt.returning(Sale))).scalar_one_or_none()
+    except IntegrityError as e:
+        await db.rollback()
+        if not is_open_table_conflict(e):
+            raise
+        raise HTTPException(status_code=400, detail="La mesa ya tiene una cuenta abierta")
+    if sale is None:
+        raise HTTPException(status_code=404, detail="Mesa no encontrada")
     await db.commit()
-    await db.refresh(sale)
-    
+    await broker.publish(sale.tenant_id, sale_event("sale_opened", sale))
+
+    if compact:
+        return compact_sale(sale, [])
+
     # Reload with full options
     result = await db.execute(
         select(Sale)
@@ -128,26 +229,29 @@ async def list_active_accounts(
     current_user: User = Depends(get_current_user)
 ):
     result = await db.execute(
-        select(Sale)
+        active_accounts_query(current_user.tenant_id)
         .options(
             selectinload(Sale.lines).joinedload(SaleLine.product).joinedload(Product.category),
             joinedload(Sale.creator),
             joinedload(Sale.closer)
         )
-        .where(Sale.status == "OPEN", Sale.tenant_id == current_user.tenant_id)
-        .order_by(Sale.created_at.desc())
     )
     return result.unique().scalars().all()
 
 
-@router.post("/{sale_id}/lines", response_model=SaleOut)
+@router.post("/{sale_id}/lines", response_model=SaleOut | SaleCompactOut)
 async def add_lines_to_account(
     sale_id: int,
     lines_in: List[SaleLineCreate],
+    compact: bool = False,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    result = await db.execute(select(Sale).where(Sale.id == sale_id, Sale.tenant_id == current_user.tenant_id))
+    query = select(Sale).where(Sale.id == sale_id, Sale.tenant_id == current_user.tenant_id)
+    if compact:
+        # Existing line ids are needed for the response, without products
+        query = query.options(selectinload(Sale.lines))
+    result = await db.execute(query)
     sale = result.scalar_one_or_none()
     
     if not sale:
@@ -156,31 +260,23 @@ async def add_lines_to_account(
     if sale.status != "OPEN":
         raise HTTPException(status_code=400, detail="La cuenta no está abierta")
 
-    total_added = 0.0
-    for line_in in lines_in:
-        # Check product
-        p_res = await db.execute(select(Product).where(Product.id == line_in.product_id, Product.tenant_id == current_user.tenant_id))
-        product = p_res.scalar_one_or_none()
-        if not product:
-             raise HTTPException(status_code=404, detail=f"Producto {line_in.product_id} no encontrado")
-        
-        price_unit = product.price
-        line_total = price_unit * line_in.quantity
-        
-        sale_line = SaleLine(
-            sale_id=sale.id,
-            product_id=product.id,
-            quantity=line_in.quantity,
-            price_unit=price_unit,
-            line_total=line_total,
-        )
-        db.add(sale_line)
-        total_added += line_total
-    
+    new_lines, total_added = await price_lines(db, current_user.tenant_id, lines_in)
+    for sale_line in new_lines:
+        sale_line.sale_id = sale.id
+    db.add_all(new_lines)
+
     sale.total += total_added
     db.add(sale)
     await db.commit()
-    
+    await broker.publish(sale.tenant_id, sale_event(
+        "sale_lines", sale,
+        upserted=[line_payload(line) for line in new_lines],
+        removed=[],
+    ))
+
+    if compact:
+        return compact_sale(sale, list(sale.lines) + new_lines)
+
     # Reload with full options
     result = await db.execute(
         select(Sale)
@@ -194,10 +290,11 @@ async def add_lines_to_account(
     return result.unique().scalar_one()
 
 
-@router.put("/{sale_id}", response_model=SaleOut)
+@router.put("/{sale_id}", response_model=SaleOut | SaleCompactOut)
 async def update_sale(
     sale_id: int,
     sale_in: SaleUpdate,
+    compact: bool = False,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -211,34 +308,31 @@ async def update_sale(
     if sale.status != "OPEN":
         raise HTTPException(status_code=400, detail="La cuenta no está abierta")
 
-    # Prepare new lines
-    new_lines = []
-    total = 0.0
-    for line_in in sale_in.lines:
-        p_res = await db.execute(select(Product).where(Product.id == line_in.product_id, Product.tenant_id == current_user.tenant_id))
-        product = p_res.scalar_one_or_none()
-        if not product:
-             raise HTTPException(status_code=404, detail=f"Producto {line_in.product_id} no encontrado")
-        
-        price_unit = product.price
-        line_total = price_unit * line_in.quantity
-        
-        sale_line = SaleLine(
-            product_id=product.id,
-            quantity=line_in.quantity,
-            price_unit=price_unit,
-            line_total=line_total,
-        )
-        new_lines.append(sale_line)
-        total += line_total
-    
-    # Replace lines (cascade deletes old ones)
-    sale.lines = new_lines
-    sale.total = total
-    
+    previous = {line.id: line_payload(line) for line in sale.lines}
+    if sale_in.merge:
+        # Only touch the lines that actually changed
+        await merge_lines(db, sale, sale_in.lines)
+    else:
+        # Prepare new lines
+        new_lines, total = await price_lines(db, current_user.tenant_id, sale_in.lines)
+
+        # Replace lines (cascade deletes old ones)
+        sale.lines = new_lines
+        sale.total = total
+
     db.add(sale)
     await db.commit()
-    
+    # Only the delta: lines added or changed, and the ids of those removed
+    current = [line_payload(line) for line in sale.lines]
+    await broker.publish(sale.tenant_id, sale_event(
+        "sale_lines", sale,
+        upserted=[line for line in current if previous.get(line["id"]) != line],
+        removed=sorted(previous.keys() - {line["id"] for line in current}),
+    ))
+
+    if compact:
+        return compact_sale(sale, sale.lines)
+
     # Reload with full options
     result = await db.execute(
         select(Sale)
@@ -252,18 +346,20 @@ async def update_sale(
     return result.unique().scalar_one()
 
 
-@router.post("/{sale_id}/close", response_model=SaleOut)
+@router.post("/{sale_id}/close", response_model=SaleOut | SaleCompactOut)
 async def close_account(
     sale_id: int,
     payment_method: str = "cash",
+    compact: bool = False,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Close (checkout) account."""
-    result = await db.execute(
-        select(Sale)
-        .where(Sale.id == sale_id, Sale.tenant_id == current_user.tenant_id)
-    )
+    # Lock the row so a double checkout cannot be counted twice
+    query = select(Sale).where(Sale.id == sale_id, Sale.tenant_id == current_user.tenant_id).with_for_update()
+    if compact:
+        query = query.options(selectinload(Sale.lines))
+    result = await db.execute(query)
     sale = result.scalar_one_or_none()
     
     if not sale:
@@ -276,8 +372,14 @@ async def close_account(
     sale.payment_method = payment_method
     sale.closed_by_id = current_user.id
     db.add(sale)
+    await record_sale(db, sale)
+    await record_sale_rollups(db, sale)
     await db.commit()
-    
+    await broker.publish(sale.tenant_id, sale_event("sale_closed", sale))
+
+    if compact:
+        return compact_sale(sale, sale.lines)
+
     # Reload relationship to return updated data
     result = await db.execute(
         select(Sale)
@@ -291,11 +393,59 @@ async def close_account(
     return result.unique().scalar_one()
 
 
+@router.post("/{sale_id}/cancel", response_model=SaleOut | SaleCompactOut)
+async def cancel_account(
+    sale_id: int,
+    compact: bool = False,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel an open account."""
+    # Lock the row like close_account, so a concurrent checkout cannot count a cancelled sale;
+    # populate_existing re-reads the status once the lock is held
+    query = (
+        select(Sale)
+        .where(Sale.id == sale_id, Sale.tenant_id == current_user.tenant_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    if compact:
+        query = query.options(selectinload(Sale.lines))
+    result = await db.execute(query)
+    sale = result.scalar_one_or_none()
+
+    if not sale:
+        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+
+    if sale.status != "OPEN":
+        raise HTTPException(status_code=400, detail="La cuenta ya está cerrada o cancelada")
+
+    sale.status = "CANCELLED"
+    sale.closed_by_id = current_user.id
+    db.add(sale)
+    await db.commit()
+    await broker.publish(sale.tenant_id, sale_event("sale_cancelled", sale))
+
+    if compact:
+        return compact_sale(sale, sale.lines)
+
+    result = await db.execute(
+        select(Sale)
+        .options(
+            selectinload(Sale.lines).joinedload(SaleLine.product).joinedload(Product.category),
+            joinedload(Sale.creator),
+            joinedload(Sale.closer)
+        )
+        .where(Sale.id == sale.id)
+    )
+    return result.unique().scalar_one()
+
+
 @router.get("/", response_model=List[SaleOut])
 async def list_sales(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """List sales."""
@@ -314,21 +464,83 @@ async def list_sales(
     return result.unique().scalars().all()
 
 
+@router.get("/history", response_model=SalePage)
+async def list_sales_history(
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    sale_status: str | None = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """List sale headers newest first, paginated by `(created_at, id)` keyset."""
+    position = decode_cursor(cursor) if cursor else None
+    query = history_query(current_user.tenant_id, limit + 1, sale_status, position)
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return SalePage(
+        items=[SaleSummaryOut.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/events")
+async def sale_events(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user_from_query)
+):
+    """Server-sent events for the tenant's open accounts."""
+    tenant_id = current_user.tenant_id
+    # The stream is long-lived: hand the connection back to the pool now
+    await db.close()
+    return StreamingResponse(
+        sse_stream(tenant_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export")
+async def export_sales(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    date_from: float | None = None,
+    date_to: float | None = None,
+    sale_status: str | None = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream sales and their lines created in `[date_from, date_to)`."""
+    query = export_query(current_user.tenant_id, date_from, date_to, sale_status)
+    if export_format == "csv":
+        return StreamingResponse(
+            stream_csv(db, query),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="sales.csv"'},
+        )
+    return StreamingResponse(
+        stream_ndjson(db, query),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="sales.ndjson"'},
+    )
+
+
 @router.get("/{sale_id}", response_model=SaleOut)
 async def get_sale(
     sale_id: int,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get sale by ID."""
     result = await db.execute(
-        select(Sale)
+        sale_query(sale_id, current_user.tenant_id)
         .options(
             selectinload(Sale.lines).joinedload(SaleLine.product).joinedload(Product.category),
             joinedload(Sale.creator),
             joinedload(Sale.closer)
         )
-        .where(Sale.id == sale_id, Sale.tenant_id == current_user.tenant_id)
     )
     sale = result.unique().scalar_one_or_none()
     if not sale:
@@ -19,8 +19,13 @@ class SaleOpen(BaseModel):
     name: str | None = None
 
 
+class SaleLineUpdate(SaleLineCreate):
+    id: int | None = None  # Existing line to update when merging
+
+
 class SaleUpdate(BaseModel):
-    lines: List[SaleLineCreate] = []
+    lines: List[SaleLineUpdate] = []
+    merge: bool = False  # Diff against current lines instead of replacing them
     payment_method: str | None = None
     status: str | None = None
 
@@ -58,3 +63,32 @@ class SaleOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SaleCompactOut(BaseModel):
+    """Lean write response built without reloading the sale."""
+    id: int
+    total: float
+    payment_method: str | None = None
+    status: str
+    table_id: int | None = None
+    line_ids: List[int]
+
+
+class SaleSummaryOut(BaseModel):
+    """Sale header without lines, used by the paginated history."""
+    id: int
+    total: float
+    payment_method: str | None = None
+    status: str
+    created_at: float
+    table_id: int | None = None
+    name: str | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class SalePage(BaseModel):
+    items: List[SaleSummaryOut]
+    next_cursor: str | None = None  # Opaque, pass back as `cursor` for the next page
@@ -1,6 +1,12 @@
+const board = {
+    tables: [],
+    activeSales: []
+};
+
 document.addEventListener('DOMContentLoaded', () => {
     checkAuth(true);
     loadData();
+    api.subscribeSales(onSaleEvent);
 });
 
 async function loadData() {
@@ -10,14 +16,30 @@ async function loadData() {
             api.getActiveSales()
         ]);
 
-        renderTables(tables, activeSales);
-        renderOtherOrders(activeSales);
+        board.tables = tables;
+        board.activeSales = activeSales;
+        renderBoard();
     } catch (err) {
         console.error(err);
         showToast('Error: ' + err.message, 'error');
     }
 }
 
+function onSaleEvent(event) {
+    // sale_changed: the event was too big to relay, reload instead
+    if (event.type === 'resync' || event.type === 'sale_changed') {
+        loadData();
+        return;
+    }
+    board.activeSales = applySaleEvent(board.activeSales, event);
+    renderBoard();
+}
+
+function renderBoard() {
+    renderTables(board.tables, board.activeSales);
+    renderOtherOrders(board.activeSales);
+}
+
 function renderTables(tables, activeSales) {
     const grid = document.getElementById('tables-grid');
 
@@ -71,11 +71,24 @@ class ApiClient {
     }
 
 
+    // --- POS Endpoints ---
+    async getPosBootstrap() {
+        return this.request('/pos/bootstrap');
+    }
+
     // --- Products Endpoints ---
     async getProducts() {
         return this.request('/products/');
     }
 
+    async searchProducts(q, substring = false) {
+        return this.request(`/products/search?q=${encodeURIComponent(q)}&substring=${substring}`);
+    }
+
+    async getProductBySku(sku) {
+        return this.request(`/products/sku/${encodeURIComponent(sku)}`);
+    }
+
     async createProduct(product) {
         return this.request('/products/', {
             method: 'POST',
@@ -126,6 +139,11 @@ class ApiClient {
         return this.request('/sales/');
     }
 
+    async getSalesHistory(cursor = null) {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        return this.request(`/sales/history${query}`);
+    }
+
     async getSale(id) {
         return this.request(`/sales/${id}`);
     }
@@ -134,6 +152,18 @@ class ApiClient {
         return this.request('/sales/active');
     }
 
+    /**
+     * Subscribes to the tenant's account events (server-sent events).
+     * EventSource cannot send headers, so the token goes in the query string.
+     */
+    subscribeSales(onEvent) {
+        const source = new EventSource(`${API_URL}/sales/events?token=${encodeURIComponent(this.token)}`);
+        ['sale_opened', 'sale_lines', 'sale_closed', 'sale_cancelled', 'sale_changed', 'resync'].forEach(type => {
+            source.addEventListener(type, e => onEvent(JSON.parse(e.data)));
+        });
+        return source;
+    }
+
     async openSale(data) {
         return this.request('/sales/open', {
             method: 'POST',
@@ -45,6 +45,11 @@ function showResult(data) {
 
     resultArea.style.display = 'block';
 
+    const otherMethods = Object.entries(data.totals_by_method || {})
+        .filter(([method]) => method !== 'cash' && method !== 'card')
+        .map(([method, total]) => `\n${(method + ':').padEnd(11)}${total.toFixed(2)}€`)
+        .join('');
+
     const formatted = `
 ID Cierre: #${data.id}
 Tipo:      ${data.closing_type}
@@ -52,7 +57,7 @@ Fecha:     ${new Date(data.date * 1000).toLocaleString()}
 Usuario:   ${data.user_id}
 
 Efectivo:  ${data.total_cash.toFixed(2)}€
-Tarjeta:   ${data.total_card.toFixed(2)}€
+Tarjeta:   ${data.total_card.toFixed(2)}€${otherMethods}
 --- Totales ---
 Ventas:    ${data.total_sales}
 Total:     ${data.total_total.toFixed(2)}€
@@ -23,21 +23,28 @@ document.addEventListener('DOMContentLoaded', () => {
     if (saleId) state.saleId = parseInt(saleId);
 
     loadPos();
+    api.subscribeSales(onSaleEvent);
 });
 
+async function onSaleEvent(event) {
+    // sale_changed: the event was too big to relay, reload instead
+    if (event.type === 'resync' || event.type === 'sale_changed') {
+        state.activeSales = await api.getActiveSales();
+    } else {
+        // The event carries the new totals; a sale is only fetched when opened
+        state.activeSales = applySaleEvent(state.activeSales, event);
+    }
+    renderOpenTablesModalContent();
+}
+
 async function loadPos() {
     try {
-        const [products, categories, tables, activeSales] = await Promise.all([
-            api.getProducts(),
-            api.getCategories(),
-            api.getTables(),
-            api.getActiveSales()
-        ]);
-
-        state.products = products;
-        state.categories = [{ id: null, name: 'Todos' }, ...categories];
+        const { catalog, tables, active_sales } = await api.getPosBootstrap();
+
+        state.products = catalog.products;
+        state.categories = [{ id: null, name: 'Todos' }, ...catalog.categories];
         state.tables = tables;
-        state.activeSales = activeSales;
+        state.activeSales = active_sales;
         state.selectedCategoryId = null;
 
         renderCategories();
@@ -266,7 +273,8 @@ async function saveOrder() {
         }));
 
         const saleData = {
-            lines: lines
+            lines: lines,
+            merge: true
         };
 
         try {
@@ -418,7 +426,7 @@ async function processPayment(paymentMethod) {
             }));
 
             if (state.cart.length > 0) {
-                await api.updateSale(state.saleId, { lines: lines });
+                await api.updateSale(state.saleId, { lines: lines, merge: true });
             }
 
             // Close sale
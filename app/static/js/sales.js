@@ -1,3 +1,4 @@
+let nextCursor = null;
 
 document.addEventListener('DOMContentLoaded', () => {
     checkAuth(true);
@@ -6,37 +7,48 @@ document.addEventListener('DOMContentLoaded', () => {
 
 async function loadSales() {
     try {
-
-
-        const sales = await api.getSales();
+        const page = await api.getSalesHistory(nextCursor);
         const container = document.getElementById('sales-list');
+        const firstPage = nextCursor === null;
 
-        if (sales.length === 0) {
+        nextCursor = page.next_cursor;
+        document.getElementById('load-more-btn').style.display = nextCursor ? 'inline-block' : 'none';
+
+        if (firstPage && page.items.length === 0) {
             container.innerHTML = '<p style="text-align: center; grid-column: 1/-1;">No hay ventas registradas</p>';
             return;
         }
 
-        container.innerHTML = sales.map(sale => `
-            <div class="sale-card" onclick='openSaleDetail(${JSON.stringify(sale).replace(/'/g, "&#39;")})'>
+        container.insertAdjacentHTML('beforeend', page.items.map(sale => `
+            <div class="sale-card" onclick="openSaleDetail(${sale.id})">
                 <div class="sale-header">
                     <strong>Ticket #${sale.id}</strong>
                     <span>${new Date(sale.created_at * 1000).toLocaleString()}</span>
                 </div>
                 <div class="sale-details">
-                    ${sale.lines.length} productos (${sale.payment_method})
+                    ${sale.status} (${sale.payment_method})
                 </div>
                 <div class="sale-total">
                     Total: ${sale.total.toFixed(2)}€
                 </div>
             </div>
-        `).join('');
+        `).join(''));
     } catch (err) {
         console.error(err);
         showToast('Error cargando ventas', 'error');
     }
 }
 
-function openSaleDetail(sale) {
+async function openSaleDetail(saleId) {
+    let sale;
+    try {
+        sale = await api.getSale(saleId);
+    } catch (err) {
+        console.error(err);
+        showToast('Error cargando la venta', 'error');
+        return;
+    }
+
     document.getElementById('detail-id').textContent = sale.id;
     document.getElementById('detail-date').textContent = new Date(sale.created_at * 1000).toLocaleString();
     document.getElementById('detail-status').textContent = sale.status;
@@ -29,3 +29,28 @@ function showToast(msg, type = 'success') {
     document.body.appendChild(toast);
     setTimeout(() => toast.remove(), 3000);
 }
+
+/**
+ * Applies a sales event to a list of active (open) sales.
+ * @param {Array} activeSales - Current open sales.
+ * @param {Object} event - Event received from api.subscribeSales.
+ * @returns {Array} Updated list of open sales. Sales whose lines were never
+ *     loaded keep `lines` undefined; fetch the sale when they are needed.
+ */
+function applySaleEvent(activeSales, event) {
+    const others = activeSales.filter(s => s.id !== event.sale.id);
+    if (event.type === 'sale_closed' || event.type === 'sale_cancelled') {
+        return others;
+    }
+
+    const current = activeSales.find(s => s.id === event.sale.id) || { lines: [] };
+    const sale = { ...current, ...event.sale };
+    // Summaries (e.g. from /pos/bootstrap) carry no lines: leave them unknown
+    if (event.type === 'sale_lines' && Array.isArray(current.lines)) {
+        const upserted = new Map(event.upserted.map(line => [line.id, line]));
+        sale.lines = current.lines
+            .filter(line => !event.removed.includes(line.id) && !upserted.has(line.id))
+            .concat(event.upserted);
+    }
+    return [sale, ...others];
+}
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from ..db import get_session
+from ..db import get_session, get_read_session
 from .models import Table
 from .schemas import TableCreate, TableOut, TableUpdate
 
@@ -38,7 +38,7 @@ async def create_table(
 async def list_tables(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     result = await db.execute(select(Table).where(Table.tenant_id == current_user.tenant_id).offset(skip).limit(limit))
@@ -47,7 +47,7 @@ async def list_tables(
 @router.get("/{table_id}", response_model=TableOut)
 async def get_table(
     table_id: int,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     result = await db.execute(select(Table).where(Table.id == table_id, Table.tenant_id == current_user.tenant_id))
@@ -0,0 +1,57 @@
+"""
+Shared fixtures: the app on a throwaway SQLite database, recreated per test.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.getcwd())
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/tpv.db")
+
+import httpx
+import pytest
+
+from app.db import Base, engine
+from app.main import app
+
+PASSWORD = "Passw0rd!"
+
+
+@pytest.fixture
+async def client():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+async def register(client, username: str) -> dict:
+    """Register a new tenant admin and return its Authorization headers."""
+    data = {"username": username, "password": PASSWORD}
+    assert (await client.post("/auth/register", json=data)).status_code == 200
+    token = (await client.post("/auth/login", json=data)).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+async def headers(client):
+    return await register(client, "admin@test.com")
+
+
+@pytest.fixture
+async def products(client, headers):
+    """Three products priced 1.50, 2.50 and 3.50; returns their ids."""
+    category = (await client.post("/products/categories/", json={"name": "Drinks"}, headers=headers)).json()
+    ids = []
+    for i in range(3):
+        response = await client.post(
+            "/products/",
+            json={"name": f"Product {i}", "price": 1.5 + i, "sku": f"SKU{i}", "category_id": category["id"]},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
@@ -0,0 +1,56 @@
+"""
+Authenticated principal cache (app/auth/cache.py).
+"""
+from sqlalchemy.future import select
+
+from app.auth.cache import principal_cache
+from app.auth.models import User
+from app.db import SessionLocal
+
+from conftest import PASSWORD
+
+
+async def login(client, username):
+    data = {"username": username, "password": PASSWORD}
+    token = (await client.post("/auth/login", json=data)).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def stats_status(client, headers):
+    response = await client.get("/auth/cache/stats", headers=headers)
+    return response.status_code
+
+
+async def test_update_evicts_the_user_at_commit(client, headers):
+    principal_cache.invalidate()
+    created = await client.post("/auth/create_user", json={"username": "cashier@test.com", "password": PASSWORD}, headers=headers)
+    cashier_id = created.json()["id"]
+    cashier = await login(client, "cashier@test.com")
+    assert await stats_status(client, cashier) == 403  # Not an admin
+    assert principal_cache.get(cashier_id).role != "admin"
+
+    async with SessionLocal() as db:
+        user = (await db.execute(select(User).where(User.id == cashier_id))).scalar_one()
+        user.role = "admin"
+        await db.flush()
+        # Flushed but not committed: other requests must still see the old row
+        assert principal_cache.get(cashier_id) is not None
+        await db.rollback()
+    assert principal_cache.get(cashier_id) is not None
+
+    async with SessionLocal() as db:
+        user = (await db.execute(select(User).where(User.id == cashier_id))).scalar_one()
+        user.role = "admin"
+        await db.commit()
+    assert principal_cache.get(cashier_id) is None
+    assert await stats_status(client, cashier) == 200
+
+
+async def test_deleted_user_is_evicted(client, headers):
+    principal_cache.invalidate()
+    created = await client.post("/auth/create_user", json={"username": "cashier@test.com", "password": PASSWORD}, headers=headers)
+    cashier = await login(client, "cashier@test.com")
+    assert await stats_status(client, cashier) == 403
+
+    assert (await client.delete(f"/auth/{created.json()['id']}", headers=headers)).status_code == 204
+    assert await stats_status(client, cashier) == 401
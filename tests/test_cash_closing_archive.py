@@ -0,0 +1,140 @@
+"""
+Z closings (DELETE /cash-closing/sales) move settled sales into the archive.
+"""
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.auth.models import User
+from app.cash_closing.service import archive_sales, build_closing, record_sale
+from app.db import SessionLocal, engine
+from app.migrations.versions import sqlite_autoincrement
+from app.sales.models import Sale
+
+
+async def sell(client, headers, product_id, quantity=1, payment_method="cash"):
+    response = await client.post("/sales/", json={
+        "payment_method": payment_method, "lines": [{"product_id": product_id, "quantity": quantity}],
+    }, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def rows(sql, **params):
+    async with engine.connect() as conn:
+        return (await conn.execute(text(sql), params)).all()
+
+
+async def test_z_closing_archives_sales_and_lines(client, headers, products):
+    p0, p1, _ = products
+    first = await sell(client, headers, p0, 2)
+    second = await sell(client, headers, p1, 1, payment_method="card")
+    open_sale = (await client.post("/sales/open", json={"name": "Bar"}, headers=headers)).json()
+
+    response = await client.delete("/cash-closing/sales", headers=headers)
+    assert response.status_code == 200, response.text
+    closing = response.json()
+    assert (closing["from_sales"], closing["to_sales"]) == (first["id"], second["id"])
+    assert closing["total_sales"] == 2 and closing["total_total"] == 3.0 + 2.5
+
+    # Settled sales left `sales`, the open account stayed on its table
+    assert [row.id for row in await rows("SELECT id FROM sales")] == [open_sale["id"]]
+    archived = await rows("SELECT id, closing_id FROM sales_archive ORDER BY id")
+    assert archived == [(first["id"], closing["id"]), (second["id"], closing["id"])]
+    lines = await rows("SELECT sale_id, closing_id FROM sale_lines_archive ORDER BY sale_id")
+    assert lines == [(first["id"], closing["id"]), (second["id"], closing["id"])]
+    assert await rows("SELECT * FROM sale_lines WHERE sale_id IN (:a, :b)", a=first["id"], b=second["id"]) == []
+
+    current = (await client.get("/cash-closing/current", headers=headers)).json()
+    assert current["total_sales"] == 0
+
+
+async def test_two_z_closings_in_a_row(client, headers, products):
+    p0, _, _ = products
+    first = await sell(client, headers, p0)
+    assert (await client.delete("/cash-closing/sales", headers=headers)).status_code == 200
+
+    # The archive keeps the old ids, new sales must not reuse them
+    second = await sell(client, headers, p0, 3)
+    assert second["id"] > first["id"]
+    response = await client.delete("/cash-closing/sales", headers=headers)
+    assert response.status_code == 200, response.text
+    closing = response.json()
+    assert (closing["from_sales"], closing["to_sales"], closing["total_sales"]) == (second["id"], second["id"], 1)
+
+    archived = await rows("SELECT id FROM sales_archive ORDER BY id")
+    assert [row.id for row in archived] == [first["id"], second["id"]]
+    assert await rows("SELECT id FROM sales") == []
+    assert len(await rows("SELECT id FROM sale_lines_archive")) == 2
+
+
+async def test_migration_renumbers_sales_reusing_archived_ids(client):
+    async with engine.begin() as conn:
+        # Schema before AUTOINCREMENT: a sale reused the id of an archived one
+        await conn.execute(text("DROP TABLE sale_lines"))
+        await conn.execute(text("DROP TABLE sales"))
+        await conn.execute(text(
+            "CREATE TABLE sales (id INTEGER NOT NULL, total FLOAT NOT NULL, payment_method VARCHAR, status VARCHAR, "
+            "created_at FLOAT, user_id INTEGER, closed_by_id INTEGER, table_id INTEGER, name VARCHAR, "
+            "tenant_id VARCHAR NOT NULL, PRIMARY KEY (id))"
+        ))
+        await conn.execute(text(
+            "CREATE TABLE sale_lines (id INTEGER NOT NULL, sale_id INTEGER NOT NULL, product_id INTEGER NOT NULL, "
+            "quantity INTEGER NOT NULL, price_unit FLOAT NOT NULL, line_total FLOAT NOT NULL, PRIMARY KEY (id))"
+        ))
+        await conn.execute(text(
+            "INSERT INTO cash_closings (id, closing_type, tenant_id, to_sales) VALUES (1, 'Z', 't1', 1)"
+        ))
+        await conn.execute(text(
+            "INSERT INTO sales_archive (id, closing_id, total, status, created_at, tenant_id) VALUES (1, 1, 5, 'CLOSED', 1, 't1')"
+        ))
+        await conn.execute(text(
+            "INSERT INTO sale_lines_archive (id, closing_id, sale_id, product_id, quantity, price_unit, line_total) "
+            "VALUES (1, 1, 1, 1, 1, 5, 5)"
+        ))
+        await conn.execute(text(
+            "INSERT INTO sales (id, total, payment_method, status, created_at, tenant_id) VALUES (1, 2, 'cash', 'CLOSED', 2, 't1')"
+        ))
+        await conn.execute(text(
+            "INSERT INTO sale_lines (id, sale_id, product_id, quantity, price_unit, line_total) VALUES (1, 1, 1, 1, 2, 2)"
+        ))
+        await conn.execute(text(
+            "INSERT INTO closing_running_totals (tenant_id, payment_method, from_sales, to_sales, sales_count, total) "
+            "VALUES ('t1', 'cash', 1, 1, 1, 2)"
+        ))
+
+        await sqlite_autoincrement(conn)
+        await sqlite_autoincrement(conn)  # Idempotent
+
+        assert (await conn.execute(text("SELECT id FROM sales"))).scalars().all() == [2]
+        assert (await conn.execute(text("SELECT id, sale_id FROM sale_lines"))).all() == [(2, 2)]
+        totals = (await conn.execute(text("SELECT from_sales, to_sales, sales_count FROM closing_running_totals"))).all()
+        assert totals == [(2, 2, 1)]
+        sequences = dict((await conn.execute(text("SELECT name, seq FROM sqlite_sequence"))).all())
+        assert sequences["sales"] == 2 and sequences["sale_lines"] == 2
+        sql = (await conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'sales'"))).scalar()
+        assert "AUTOINCREMENT" in sql
+
+
+async def test_sale_settled_with_a_new_method_during_a_z_closing_is_kept(client, headers, products):
+    account = (await client.post("/sales/open", json={"name": "Bar"}, headers=headers)).json()
+    await client.post(f"/sales/{account['id']}/lines", json=[{"product_id": products[0], "quantity": 1}], headers=headers)
+    sold = await sell(client, headers, products[1])
+
+    async with SessionLocal() as db:
+        user = (await db.execute(select(User).where(User.username == "admin@test.com"))).scalar_one()
+        closing = await build_closing(db, user, "Z")
+        db.add(closing)
+        await db.flush()
+        # The account is settled with a payment method the closing did not read
+        sale = await db.get(Sale, account["id"])
+        sale.status, sale.payment_method = "CLOSED", "bizum"
+        await db.flush()
+        await record_sale(db, sale)
+        await archive_sales(db, closing)
+        await db.commit()
+
+    assert closing.totals_by_method == {"cash": 2.5}
+    assert [row.id for row in await rows("SELECT id FROM sales_archive")] == [sold["id"]]
+    assert [row.id for row in await rows("SELECT id FROM sales")] == [account["id"]]
+    current = (await client.get("/cash-closing/current", headers=headers)).json()
+    assert (current["total_sales"], current["totals_by_method"]) == (1, {"bizum": 1.5})
@@ -0,0 +1,59 @@
+"""
+X and Z closings (POST /cash-closing/, DELETE /cash-closing/sales) per payment method.
+"""
+
+
+async def sell(client, headers, product_id, quantity, payment_method):
+    response = await client.post("/sales/", json={
+        "payment_method": payment_method, "lines": [{"product_id": product_id, "quantity": quantity}],
+    }, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def figures(closing):
+    return {
+        field: closing[field]
+        for field in ("total_sales", "total_cash", "total_card", "total_total", "totals_by_method")
+    }
+
+
+async def test_x_and_z_closings_total_each_method(client, headers, products):
+    p0, p1, p2 = products
+    first = await sell(client, headers, p0, 2, "cash")  # 3.0
+    await sell(client, headers, p1, 1, "card")  # 2.5
+    await sell(client, headers, p2, 1, "bizum")  # 3.5
+    last = await sell(client, headers, p0, 1, "cash")  # 1.5
+    # Neither open nor cancelled accounts count
+    await client.post("/sales/open", json={"name": "Bar"}, headers=headers)
+    cancelled = (await client.post("/sales/open", json={"name": "Terraza"}, headers=headers)).json()
+    await client.post(f"/sales/{cancelled['id']}/lines", json=[{"product_id": p0, "quantity": 5}], headers=headers)
+    assert (await client.post(f"/sales/{cancelled['id']}/cancel", headers=headers)).status_code == 200
+
+    expected = {
+        "total_sales": 4, "total_cash": 4.5, "total_card": 2.5, "total_total": 10.5,
+        "totals_by_method": {"cash": 4.5, "card": 2.5, "bizum": 3.5},
+    }
+    response = await client.post("/cash-closing/", headers=headers)
+    assert response.status_code == 200, response.text
+    x = response.json()
+    assert x["closing_type"] == "X" and figures(x) == expected
+    assert (x["from_sales"], x["to_sales"]) == (first, last)
+
+    # An X closing resets nothing
+    assert figures((await client.post("/cash-closing/", headers=headers)).json()) == expected
+
+    z = (await client.delete("/cash-closing/sales", headers=headers)).json()
+    assert z["closing_type"] == "Z" and figures(z) == expected
+
+    current = (await client.get("/cash-closing/current", headers=headers)).json()
+    assert (current["total_sales"], current["total_total"]) == (0, 0)
+    response = await client.post("/cash-closing/", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No hay ventas para cerrar"
+
+    # The next period starts from zero
+    await sell(client, headers, p1, 2, "card")
+    assert figures((await client.post("/cash-closing/", headers=headers)).json()) == {
+        "total_sales": 1, "total_cash": 0, "total_card": 5.0, "total_total": 5.0, "totals_by_method": {"card": 5.0},
+    }
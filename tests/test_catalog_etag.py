@@ -0,0 +1,36 @@
+"""
+Catalog snapshots with ETags (GET /products/, GET /products/categories/).
+"""
+
+
+async def test_unchanged_catalog_answers_304(client, headers, products):
+    first = await client.get("/products/", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert len(first.json()) == 3
+
+    cached = await client.get("/products/", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag and cached.content == b""
+    listed = await client.get("/products/", headers={**headers, "If-None-Match": f'"stale", {etag}'})
+    assert listed.status_code == 304
+
+    # A write changes the snapshot and its tag
+    response = await client.put(f"/products/{products[0]}", json={"price": 9.99}, headers=headers)
+    assert response.status_code == 200, response.text
+    changed = await client.get("/products/", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert 9.99 in [product["price"] for product in changed.json()]
+
+
+async def test_each_listing_has_its_own_tag(client, headers, products):
+    products_tag = (await client.get("/products/", headers=headers)).headers["etag"]
+    categories = await client.get("/products/categories/", headers=headers)
+    assert categories.status_code == 200
+    assert categories.headers["etag"] != products_tag
+    assert (await client.get("/products/categories/", headers={**headers, "If-None-Match": categories.headers["etag"]})).status_code == 304
+
+    # Served again from the snapshot, same tag
+    assert (await client.get("/products/", headers=headers)).headers["etag"] == products_tag
@@ -0,0 +1,58 @@
+"""
+Connection pool metrics (GET /system/db-pool).
+"""
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import pool, routes
+from app.core.pool import InstrumentedPool, PoolMetrics
+
+from conftest import PASSWORD
+
+GAUGES = {"size", "checked_out", "checked_in", "overflow", "max_overflow", "timeout"}
+COUNTERS = {"checkouts", "timeouts", "wait_avg_ms", "wait_p95_ms", "wait_max_ms"}
+
+
+@pytest.fixture
+async def pooled(client, tmp_path, monkeypatch):
+    """An instrumented pool of two connections behind the endpoint, with fresh counters."""
+    metrics = PoolMetrics()
+    monkeypatch.setattr(pool, "pool_metrics", metrics)
+    monkeypatch.setattr(routes, "pool_metrics", metrics)
+    pooled_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedPool, pool_size=2, max_overflow=0, pool_timeout=0.1,
+    )
+    monkeypatch.setattr(routes, "engine", pooled_engine)
+    yield pooled_engine
+    await pooled_engine.dispose()
+
+
+async def test_reports_gauges_checkouts_and_timeouts(client, headers, pooled):
+    async with pooled.connect() as first:
+        await first.execute(text("SELECT 1"))
+        stats = (await client.get("/system/db-pool", headers=headers)).json()
+        assert set(stats) == GAUGES | COUNTERS
+        assert (stats["size"], stats["checked_out"], stats["max_overflow"], stats["timeout"]) == (2, 1, 0, 0.1)
+        assert (stats["checkouts"], stats["timeouts"]) == (1, 0)
+
+        async with pooled.connect() as second:
+            await second.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                async with pooled.connect():
+                    pass
+
+    stats = (await client.get("/system/db-pool", headers=headers)).json()
+    assert (stats["checked_out"], stats["checked_in"]) == (0, 2)
+    assert (stats["checkouts"], stats["timeouts"]) == (2, 1)
+    assert 0 <= stats["wait_avg_ms"] <= stats["wait_max_ms"]
+
+
+async def test_admins_only(client, headers):
+    assert (await client.get("/system/db-pool")).status_code == 401
+    data = {"username": "cashier@test.com", "password": PASSWORD}
+    assert (await client.post("/auth/create_user", json=data, headers=headers)).status_code == 200
+    login = await client.post("/auth/login", json=data)
+    cashier = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert (await client.get("/system/db-pool", headers=cashier)).status_code == 403
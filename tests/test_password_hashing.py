@@ -0,0 +1,41 @@
+"""
+bcrypt runs on a bounded executor (app/auth/security.py).
+"""
+import asyncio
+import threading
+
+from app.auth import security
+from app.config import settings
+
+from conftest import PASSWORD
+
+
+async def test_full_hash_queue_answers_503(client, headers, monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_max_pending", 1)
+    release = threading.Event()
+    verify_password = security.verify_password
+
+    def slow_verify(plain_password, hashed_password):
+        release.wait(5)
+        return verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(security, "verify_password", slow_verify)
+    data = {"username": "admin@test.com", "password": PASSWORD}
+    first = asyncio.create_task(client.post("/auth/login", json=data))
+    while security._pending_hashes == 0:
+        await asyncio.sleep(0.01)
+
+    busy = await client.post("/auth/login", json=data)
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+
+    release.set()
+    assert (await first).status_code == 200
+    assert security._pending_hashes == 0
+    assert (await client.post("/auth/login", json=data)).status_code == 200
+
+
+async def test_executor_is_recreated_after_shutdown():
+    hashed = await security.get_password_hash_async(PASSWORD)
+    security.shutdown_hash_executor()
+    assert await security.verify_password_async(PASSWORD, hashed)
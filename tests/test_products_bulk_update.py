@@ -0,0 +1,32 @@
+"""
+Bulk repricing and patching (POST /products/bulk-update).
+"""
+
+
+async def prices(client, headers):
+    return {p["sku"]: p["price"] for p in (await client.get("/products/", headers=headers)).json()}
+
+
+async def bulk_update(client, headers, body):
+    return await client.post("/products/bulk-update", json=body, headers=headers)
+
+
+async def test_price_percent_reprices_the_matching_products(client, headers, products):
+    response = await bulk_update(client, headers, {"filter": {"skus": ["SKU0", "SKU2"]}, "price_percent": -10})
+    assert response.status_code == 200, response.text
+    assert response.json() == {"updated": 2}
+    assert await prices(client, headers) == {"SKU0": 1.35, "SKU1": 2.5, "SKU2": 3.15}
+
+
+async def test_rejects_percentages_and_prices_below_zero(client, headers, products):
+    everything = {"ids": products}
+    for body in ({"price_percent": -100}, {"price_percent": -250}, {"patch": {"price": -1}}):
+        response = await bulk_update(client, headers, {"filter": everything, **body})
+        assert response.status_code == 422, body
+
+    # A stored negative price stays negative whatever the factor: nothing is changed
+    category_id = (await client.get("/products/", headers=headers)).json()[0]["category_id"]
+    await client.post("/products/", json={"name": "Refund", "price": -1.0, "sku": "NEG", "category_id": category_id}, headers=headers)
+    response = await bulk_update(client, headers, {"filter": {"category_id": category_id}, "price_percent": 5})
+    assert response.status_code == 400
+    assert await prices(client, headers) == {"SKU0": 1.5, "SKU1": 2.5, "SKU2": 3.5, "NEG": -1.0}
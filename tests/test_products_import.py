@@ -0,0 +1,43 @@
+"""
+Bulk catalog import (POST /products/import).
+"""
+
+
+async def import_csv(client, headers, body):
+    response = await client.post(
+        "/products/import", params={"format": "csv"}, content=body.encode(),
+        headers={**headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_repeated_sku_keeps_the_last_row_and_reports_the_others(client, headers):
+    report = await import_csv(client, headers, (
+        "name,price,sku,category\n"
+        "Cola,1.0,C1,Drinks\n"
+        "Water,0.8,W1,Drinks\n"
+        "Cola Zero,1.2,C1,Drinks\n"
+    ))
+    assert (report["created"], report["updated"], report["failed"]) == (2, 0, 1)
+    assert report["errors"] == [{"row": 1, "sku": "C1", "error": "SKU repetido en la fila 3"}]
+
+    products = (await client.get("/products/", headers=headers)).json()
+    assert sorted((p["sku"], p["name"], p["price"]) for p in products) == [("C1", "Cola Zero", 1.2), ("W1", "Water", 0.8)]
+
+
+async def test_rejects_non_finite_and_negative_amounts(client, headers):
+    report = await import_csv(client, headers, (
+        "name,price,sku,category,tax\n"
+        "A,nan,A1,Drinks,0\n"
+        "B,inf,B1,Drinks,0\n"
+        "C,-1,C1,Drinks,0\n"
+        "D,1,D1,Drinks,-0.1\n"
+        "E,1,E1,Drinks,nan\n"
+        "F,1,F1,Drinks,0.21\n"
+    ))
+    assert (report["created"], report["failed"]) == (1, 5)
+    assert [(e["row"], e["error"]) for e in report["errors"]] == [
+        (1, "Precio no válido"), (2, "Precio no válido"), (3, "Precio no válido"),
+        (4, "Impuesto no válido"), (5, "Impuesto no válido"),
+    ]
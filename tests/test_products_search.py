@@ -0,0 +1,70 @@
+"""
+Product name search and SKU lookup (app/products/search.py).
+"""
+from app.products.search import product_index
+
+from conftest import register
+
+
+async def names(client, headers, q, substring=False):
+    response = await client.get("/products/search", params={"q": q, "substring": substring}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [product["name"] for product in response.json()]
+
+
+async def create(client, headers, category_id, name, sku):
+    response = await client.post("/products/", json={
+        "name": name, "price": 1.0, "sku": sku, "category_id": category_id,
+    }, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def test_prefix_substring_and_sku(client, headers, products):
+    category_id = (await client.get(f"/products/{products[0]}", headers=headers)).json()["category_id"]
+    await create(client, headers, category_id, "Coca Cola", "8400001")
+    await create(client, headers, category_id, "cola Zero", "8400002")
+
+    assert await names(client, headers, "COLA") == ["cola Zero"]
+    assert await names(client, headers, "cola", substring=True) == ["Coca Cola", "cola Zero"]
+    assert await names(client, headers, "product") == ["Product 0", "Product 1", "Product 2"]
+    response = await client.get("/products/search", params={"q": "product", "limit": 2}, headers=headers)
+    assert len(response.json()) == 2
+
+    assert (await client.get("/products/sku/8400001", headers=headers)).json()["name"] == "Coca Cola"
+    assert (await client.get("/products/sku/0000000", headers=headers)).status_code == 404
+
+    # Other tenants have their own index
+    other = await register(client, "other@test.com")
+    assert await names(client, other, "cola", substring=True) == []
+    assert (await client.get("/products/sku/8400001", headers=other)).status_code == 404
+
+
+async def test_writes_refresh_the_index(client, headers, products):
+    p0, p1, _ = products
+    category_id = (await client.get(f"/products/{p0}", headers=headers)).json()["category_id"]
+    assert await names(client, headers, "product") == ["Product 0", "Product 1", "Product 2"]
+
+    await create(client, headers, category_id, "Agua", "A1")
+    await client.put(f"/products/{p0}", json={"name": "Zumo", "sku": "Z1"}, headers=headers)
+    await client.delete(f"/products/{p1}", headers=headers)
+    assert await names(client, headers, "product") == ["Product 2"]
+    assert await names(client, headers, "agua") == ["Agua"]
+    assert (await client.get("/products/sku/Z1", headers=headers)).json()["id"] == p0
+    assert (await client.get("/products/sku/SKU0", headers=headers)).status_code == 404
+
+    # Bulk writes drop the index, the next lookup reloads it
+    response = await client.post("/products/import", params={"format": "ndjson"}, headers=headers, content=(
+        b'{"name": "Agua con gas", "price": 1.2, "sku": "A2", "category": "Drinks"}\n'
+    ))
+    assert response.status_code == 200, response.text
+    assert await names(client, headers, "agua") == ["Agua", "Agua con gas"]
+
+
+async def test_only_the_most_recent_tenants_are_indexed(client, headers, products, monkeypatch):
+    monkeypatch.setattr(product_index, "max_tenants", 1)
+    other = await register(client, "other@test.com")
+    await names(client, headers, "product")
+    await names(client, other, "product")
+    assert len(product_index._tenants) == 1
+    assert await names(client, headers, "product") == ["Product 0", "Product 1", "Product 2"]
@@ -0,0 +1,134 @@
+"""
+Query plan check: the hot route queries must not scan the big tables.
+
+Seeds many tenants' worth of sales, lines, products and closings, then runs
+EXPLAIN on the statements built by the routes' query builders and fails if the plan reads sales, sale_lines,
+products or cash_closings sequentially. Runs against TEST_DATABASE_URL
+(a throwaway database: its tables are dropped and recreated), or a
+temporary SQLite file by default.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_query_plans.py
+"""
+import json
+import os
+import sys
+
+sys.path.append(os.getcwd())
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+
+from app.db import Base
+from app.migrations import versions  # noqa: F401  (registers every model)
+from app.products.importer import existing_skus_query
+from app.products.models import Product, Category
+from app.products.search import tenant_products_query
+from app.reports.analytics import watermark_query
+from app.sales.models import Sale, SaleLine
+from app.sales.routes import active_accounts_query, history_query, open_account_statement, sale_query
+from app.cash_closing.models import CashClosing
+
+TENANTS = 50
+SALES_PER_TENANT = 400
+LINES_PER_SALE = 3
+PRODUCTS_PER_TENANT = 100
+CLOSINGS_PER_TENANT = 20
+BIG_TABLES = {"sales", "sale_lines", "products", "cash_closings"}
+
+TENANT = "tenant-7"
+
+
+def route_queries():
+    """The statements the routes run, built by their own query builders."""
+    account = {
+        "total": 0.0, "status": "OPEN", "table_id": 3, "name": None,
+        "user_id": 1, "tenant_id": TENANT, "created_at": 5000.0,
+    }
+    return {
+        "active accounts": active_accounts_query(TENANT),
+        "open account of a table": open_account_statement(account).returning(Sale),
+        "history page": history_query(TENANT, 51, position=(5000.0, 10 ** 9)),
+        "history page by status": history_query(TENANT, 51, "CLOSED", (5000.0, 10 ** 9)),
+        "sale by id": sale_query(1234, TENANT),
+        # Emitted by selectinload(Sale.lines), not by the routes
+        "lines of sales (selectinload)": select(SaleLine).where(SaleLine.sale_id.in_([10, 11, 12])),
+        "products of a tenant (search index)": tenant_products_query(TENANT),
+        "existing SKUs (import)": existing_skus_query(TENANT, ["SKU-7-42", "SKU-7-43"]),
+        "analytics watermark": watermark_query(TENANT),
+    }
+
+
+async def seed(conn):
+    await conn.execute(insert(Category), [{"id": t + 1, "name": "Cat", "tenant_id": f"tenant-{t}"} for t in range(TENANTS)])
+    await conn.execute(insert(Product), [
+        {"name": f"Product {p}", "sku": f"SKU-{t}-{p}", "price": 1.0, "tenant_id": f"tenant-{t}", "category_id": t + 1}
+        for t in range(TENANTS) for p in range(PRODUCTS_PER_TENANT)
+    ])
+    sales, lines = [], []
+    for t in range(TENANTS):
+        for s in range(SALES_PER_TENANT):
+            sale_id = t * SALES_PER_TENANT + s + 1
+            sales.append({
+                "id": sale_id, "total": 3.0, "status": "OPEN" if s % 50 == 0 else "CLOSED",
+                "payment_method": "cash", "created_at": float(s * 10), "table_id": None,
+                "tenant_id": f"tenant-{t}",
+            })
+            lines.extend(
+                {"sale_id": sale_id, "product_id": t * PRODUCTS_PER_TENANT + l + 1, "quantity": 1, "price_unit": 1.0, "line_total": 1.0}
+                for l in range(LINES_PER_SALE)
+            )
+    await conn.execute(insert(Sale), sales)
+    await conn.execute(insert(SaleLine), lines)
+    await conn.execute(insert(CashClosing), [
+        {"closing_type": "X", "tenant_id": f"tenant-{t}", "date": float(c)}
+        for t in range(TENANTS) for c in range(CLOSINGS_PER_TENANT)
+    ])
+    await conn.execute(text("ANALYZE"))
+
+
+def sequential_scans(dialect: str, plan_rows) -> list:
+    if dialect == "postgresql":
+        found = []
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in BIG_TABLES:
+                found.append(node["Relation Name"])
+            for child in node.get("Plans", []):
+                walk(child)
+
+        plan = plan_rows[0][0]
+        walk((json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"])
+        return found
+    # SQLite: "SCAN <table>" is a full scan, "SEARCH <table> USING ..." is not
+    details = [row[-1] for row in plan_rows]
+    return [
+        detail for detail in details
+        if detail.startswith("SCAN ") and detail.split()[1] in BIG_TABLES
+    ]
+
+
+async def test_route_queries_use_indexes(tmp_path):
+    url = os.environ.get("TEST_DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path}/plans.db")
+    engine = create_async_engine(url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            await seed(conn)
+
+        dialect = engine.dialect
+        explain = "EXPLAIN (FORMAT JSON) " if dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+        failures = {}
+        async with engine.connect() as conn:
+            for name, query in route_queries().items():
+                sql = str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+                plan_rows = (await conn.execute(text(explain + sql))).all()
+                scans = sequential_scans(dialect.name, plan_rows)
+                if scans:
+                    failures[name] = scans
+        assert not failures, f"Sequential scans: {failures}"
+    finally:
+        await engine.dispose()
@@ -0,0 +1,59 @@
+"""
+Read-only endpoints on the replica, with read-your-writes (app/core/replica.py).
+"""
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import db as app_db
+from app.core.replica import PRIMARY_COOKIE, ReadYourWritesMiddleware
+from app.core.sharding import RoutingSession
+from app.db import Base
+from app.main import app
+
+
+@pytest.fixture
+async def replica(client, tmp_path, monkeypatch):
+    """A separate, never replicated SQLite file behind `get_read_session`."""
+    read_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    async with read_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(app_db, "read_engine", read_engine)
+    monkeypatch.setattr(app_db, "ReadSessionLocal", sessionmaker(
+        bind=read_engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+    ))
+    yield read_engine
+    await read_engine.dispose()
+
+
+async def table_names(client, headers):
+    client.cookies.clear()
+    response = await client.get("/tables/", headers=headers)
+    assert response.status_code == 200, response.text
+    return [table["name"] for table in response.json()]
+
+
+async def test_reads_go_to_the_replica_unless_the_client_just_wrote(client, headers, replica):
+    response = await client.post("/tables/", json={"name": "Terraza 1"}, headers=headers)
+    assert response.status_code == 201, response.text
+
+    # Not replicated: invisible on the replica, visible when pinned to the primary
+    assert await table_names(client, headers) == []
+    assert await table_names(client, {**headers, "Cookie": f"{PRIMARY_COOKIE}=1"}) == ["Terraza 1"]
+
+
+async def test_a_write_pins_the_client_to_the_primary(client, headers, replica):
+    transport = httpx.ASGITransport(app=ReadYourWritesMiddleware(app, seconds=5))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as pinned:
+        response = await pinned.post("/tables/", json={"name": "Barra"}, headers=headers)
+        assert response.status_code == 201, response.text
+        assert pinned.cookies.get(PRIMARY_COOKIE) == "1"
+        response = await pinned.get("/tables/", headers=headers)
+        assert [table["name"] for table in response.json()] == ["Barra"]
+
+        # Failed writes do not pin
+        pinned.cookies.clear()
+        response = await pinned.post("/tables/", json={"name": "Barra"}, headers=headers)
+        assert response.status_code == 400
+        assert PRIMARY_COOKIE not in pinned.cookies
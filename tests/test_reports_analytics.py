@@ -0,0 +1,35 @@
+"""
+Ad-hoc analytics (/reports/analytics/*) over live and archived sales.
+"""
+from app.reports import analytics
+
+
+async def sell(client, headers, lines, payment_method="cash"):
+    response = await client.post("/sales/", json={"payment_method": payment_method, "lines": lines}, headers=headers)
+    assert response.status_code == 201, response.text
+
+
+async def test_group_by_and_tickets(client, headers, products):
+    p0, p1, _ = products
+    await sell(client, headers, [{"product_id": p0, "quantity": 2}, {"product_id": p1, "quantity": 1}])
+    # Archived sales count too
+    assert (await client.delete("/cash-closing/sales", headers=headers)).status_code == 200
+    await sell(client, headers, [{"product_id": p1, "quantity": 1}], payment_method="card")
+
+    response = await client.get("/reports/analytics/group-by", params={"by": "product", "metric": "total"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [(row["key"], row["label"], row["value"]) for row in response.json()] == [
+        (str(p1), "Product 1", 5.0), (str(p0), "Product 0", 3.0),
+    ]
+
+    response = await client.get("/reports/analytics/group-by", params={"by": "payment", "metric": "sales"}, headers=headers)
+    assert {row["key"]: row["value"] for row in response.json()} == {"cash": 1, "card": 1}
+
+    tickets = (await client.get("/reports/analytics/tickets", params={"q": [50]}, headers=headers)).json()
+    assert tickets["sales"] == 2 and tickets["mean"] == (5.5 + 2.5) / 2
+
+
+async def test_without_numpy_analytics_answer_501(client, headers, monkeypatch):
+    monkeypatch.setattr(analytics, "np", None)
+    response = await client.get("/reports/analytics/group-by", headers=headers)
+    assert response.status_code == 501
@@ -0,0 +1,60 @@
+"""
+Sales rollups (app/reports/rollups.py) and the reports read from them.
+"""
+from sqlalchemy import text
+
+from app.db import SessionLocal, engine
+from app.reports.rollups import bucket_start, rebuild_rollups
+
+
+async def sell(client, headers, lines, payment_method="cash"):
+    response = await client.post("/sales/", json={"payment_method": payment_method, "lines": lines}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def rollup_rows():
+    async with engine.connect() as conn:
+        return (await conn.execute(text(
+            "SELECT * FROM sales_rollups ORDER BY tenant_id, granularity, bucket, dimension, key"
+        ))).all()
+
+
+async def test_settled_sales_add_up_in_the_rollups(client, headers, products):
+    p0, p1, _ = products
+    first = await sell(client, headers, [{"product_id": p0, "quantity": 2}, {"product_id": p1, "quantity": 1}])
+    await sell(client, headers, [{"product_id": p0, "quantity": 1}])
+    await sell(client, headers, [{"product_id": p1, "quantity": 4}], payment_method="card")
+    # Open accounts are not in the rollups until they are closed
+    account = (await client.post("/sales/open", json={"name": "Bar"}, headers=headers)).json()
+    await client.post(f"/sales/{account['id']}/lines", json=[{"product_id": p0, "quantity": 1}], headers=headers)
+
+    series = (await client.get("/reports/sales", params={"dimension": "payment"}, headers=headers)).json()
+    day = bucket_start(first["created_at"], "day")
+    assert [(row["bucket"], row["key"], row["sales_count"], row["total"]) for row in series] == [
+        (day, "card", 1, 10.0), (day, "cash", 2, 7.0),
+    ]
+
+    assert (await client.post(f"/sales/{account['id']}/close", headers=headers)).status_code == 200
+    top = (await client.get("/reports/top", params={"dimension": "product"}, headers=headers)).json()
+    assert [(row["key"], row["label"], row["sales_count"], row["quantity"], row["total"]) for row in top] == [
+        (str(p1), "Product 1", 2, 5, 12.5), (str(p0), "Product 0", 3, 4, 6.0),
+    ]
+    hours = (await client.get("/reports/sales", params={"dimension": "category", "granularity": "hour"}, headers=headers)).json()
+    assert sum(row["total"] for row in hours) == 18.5
+    assert {row["label"] for row in hours} == {"Drinks"}
+
+
+async def test_rebuild_matches_the_incremental_rollups(client, headers, products):
+    p0, p1, p2 = products
+    await sell(client, headers, [{"product_id": p0, "quantity": 2}, {"product_id": p2, "quantity": 1}])
+    assert (await client.delete("/cash-closing/sales", headers=headers)).status_code == 200
+    await sell(client, headers, [{"product_id": p1, "quantity": 1}], payment_method="card")
+    incremental = await rollup_rows()
+    assert incremental
+
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE sales_rollups SET total = total + 100"))
+    async with SessionLocal() as db:
+        assert await rebuild_rollups(db) == 2
+    assert await rollup_rows() == incremental
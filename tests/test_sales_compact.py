@@ -0,0 +1,52 @@
+"""
+Compact write responses (?compact=true on the sales write routes).
+"""
+COMPACT_FIELDS = {"id", "total", "payment_method", "status", "table_id", "line_ids"}
+
+COMPACT = {"compact": "true"}
+
+
+async def line_ids(client, headers, sale_id):
+    sale = (await client.get(f"/sales/{sale_id}", headers=headers)).json()
+    return sorted(line["id"] for line in sale["lines"])
+
+
+async def test_create_returns_the_compact_shape(client, headers, products):
+    lines = [{"product_id": products[0], "quantity": 2}, {"product_id": products[1], "quantity": 1}]
+    response = await client.post("/sales/", json={"payment_method": "card", "lines": lines}, params=COMPACT, headers=headers)
+    assert response.status_code == 201, response.text
+    sale = response.json()
+    assert set(sale) == COMPACT_FIELDS
+    assert (sale["total"], sale["payment_method"], sale["status"], sale["table_id"]) == (5.5, "card", "CLOSED", None)
+    assert sorted(sale["line_ids"]) == await line_ids(client, headers, sale["id"])
+
+    # Without the flag the full sale comes back
+    response = await client.post("/sales/", json={"lines": lines}, headers=headers)
+    assert "lines" in response.json()
+
+
+async def test_account_lifecycle_in_compact_mode(client, headers, products):
+    p0, p1, p2 = products
+    table_id = (await client.post("/tables/", json={"name": "Mesa 1"}, headers=headers)).json()["id"]
+    sale = (await client.post("/sales/open", json={"table_id": table_id}, params=COMPACT, headers=headers)).json()
+    assert set(sale) == COMPACT_FIELDS
+    assert (sale["status"], sale["table_id"], sale["line_ids"]) == ("OPEN", table_id, [])
+
+    response = await client.post(f"/sales/{sale['id']}/lines", json=[{"product_id": p0, "quantity": 2}], params=COMPACT, headers=headers)
+    assert response.status_code == 200, response.text
+    added = response.json()
+    assert added["total"] == 3.0 and added["line_ids"] == await line_ids(client, headers, sale["id"])
+
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": [
+        {"product_id": p1, "quantity": 1}, {"product_id": p2, "quantity": 1},
+    ]}, params=COMPACT, headers=headers)
+    assert response.status_code == 200, response.text
+    merged = response.json()
+    assert merged["total"] == 6.0
+    assert sorted(merged["line_ids"]) == await line_ids(client, headers, sale["id"])
+
+    response = await client.post(f"/sales/{sale['id']}/close", params=COMPACT, headers=headers)
+    assert response.status_code == 200, response.text
+    closed = response.json()
+    assert set(closed) == COMPACT_FIELDS
+    assert (closed["status"], closed["total"]) == ("CLOSED", 6.0)
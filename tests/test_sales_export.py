@@ -0,0 +1,55 @@
+"""
+Streaming sales export (GET /sales/export).
+"""
+import csv
+import io
+import json
+
+from app.sales import export
+
+
+async def sell(client, headers, lines, payment_method="cash"):
+    response = await client.post("/sales/", json={"payment_method": payment_method, "lines": lines}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def test_ndjson_nests_the_lines_of_each_sale(client, headers, products, monkeypatch):
+    # Several batches, with a sale split across two of them
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    p0, p1, p2 = products
+    first = await sell(client, headers, [{"product_id": p0, "quantity": 2}, {"product_id": p1, "quantity": 1}, {"product_id": p2, "quantity": 1}])
+    second = await sell(client, headers, [{"product_id": p1, "quantity": 3}], payment_method="card")
+    empty = (await client.post("/sales/open", json={"name": "Bar"}, headers=headers)).json()["id"]
+
+    response = await client.get("/sales/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    sales = [json.loads(line) for line in response.text.splitlines()]
+    assert [sale["id"] for sale in sales] == [first, second, empty]
+    assert [(line["sku"], line["quantity"], line["line_total"]) for line in sales[0]["lines"]] == [
+        ("SKU0", 2, 3.0), ("SKU1", 1, 2.5), ("SKU2", 1, 3.5),
+    ]
+    assert (sales[1]["payment_method"], sales[1]["total"], len(sales[1]["lines"])) == ("card", 7.5, 1)
+    assert (sales[2]["status"], sales[2]["lines"]) == ("OPEN", [])
+
+    response = await client.get("/sales/export", params={"status": "OPEN"}, headers=headers)
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [empty]
+
+
+async def test_csv_has_one_row_per_line(client, headers, products):
+    p0, p1, _ = products
+    first = await sell(client, headers, [{"product_id": p0, "quantity": 2}, {"product_id": p1, "quantity": 1}])
+
+    response = await client.get("/sales/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["sale_id"], row["product_name"], row["quantity"]) for row in rows] == [
+        (str(first), "Product 0", "2"), (str(first), "Product 1", "1"),
+    ]
+    assert {row["total"] for row in rows} == {"5.5"}
+
+    # Outside the date range nothing but the header
+    response = await client.get("/sales/export", params={"format": "csv", "date_to": 0}, headers=headers)
+    assert response.text.splitlines() == [",".join(["sale_id"] + export.SALE_FIELDS[1:] + export.LINE_FIELDS)]
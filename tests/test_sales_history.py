@@ -0,0 +1,39 @@
+"""
+Keyset-paginated sales history (GET /sales/history).
+"""
+from sqlalchemy import text
+
+from app.db import engine
+
+
+async def test_cursor_walks_every_sale_once_newest_first(client, headers, products):
+    ids = []
+    for _ in range(5):
+        response = await client.post("/sales/", json={"lines": [{"product_id": products[0], "quantity": 1}]}, headers=headers)
+        ids.append(response.json()["id"])
+    open_id = (await client.post("/sales/open", json={"name": "Bar"}, headers=headers)).json()["id"]
+    # Ties on created_at are broken by id
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE sales SET created_at = 1000 WHERE id IN (:a, :b, :c)"), dict(zip("abc", ids[1:4])))
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/sales/history", params=params, headers=headers)).json()
+        assert len(page["items"]) <= 2
+        assert set(page["items"][0]) == {"id", "total", "payment_method", "status", "created_at", "table_id", "name"}
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [open_id, ids[4], ids[0], ids[3], ids[2], ids[1]]
+
+    open_only = (await client.get("/sales/history", params={"status": "OPEN"}, headers=headers)).json()
+    assert [item["id"] for item in open_only["items"]] == [open_id] and open_only["next_cursor"] is None
+
+
+async def test_bad_cursor_is_a_400(client, headers):
+    for cursor in ("not-base64!", "bm90IGpzb24=", "WzFd"):  # garbage, "not json", "[1]"
+        response = await client.get("/sales/history", params={"cursor": cursor}, headers=headers)
+        assert response.status_code == 400, cursor
+        assert response.json()["detail"] == "Cursor no válido"
@@ -0,0 +1,83 @@
+"""
+PUT /sales/{id} with `merge`: lines are matched, kept, updated or removed.
+"""
+
+
+async def open_sale(client, headers, lines):
+    sale = (await client.post("/sales/open", json={"name": "Bar"}, headers=headers)).json()
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": lines}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def lines_by_product(sale):
+    return {line["product_id"]: line for line in sale["lines"]}
+
+
+async def test_merge_matches_by_product_and_updates_total(client, headers, products):
+    p0, p1, p2 = products
+    sale = await open_sale(client, headers, [{"product_id": p0, "quantity": 1}, {"product_id": p1, "quantity": 2}])
+    assert sale["total"] == 1.5 + 5.0
+    before = lines_by_product(sale)
+
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": [
+        {"product_id": p0, "quantity": 3},
+        {"product_id": p1, "quantity": 2},
+        {"product_id": p2, "quantity": 1},
+    ]}, headers=headers)
+    sale = response.json()
+    after = lines_by_product(sale)
+
+    # Existing lines keep their ids, the new product gets a new line
+    assert after[p0]["id"] == before[p0]["id"] and after[p0]["quantity"] == 3
+    assert after[p1]["id"] == before[p1]["id"]
+    assert p2 in after and after[p2]["id"] not in {line["id"] for line in before.values()}
+    assert sale["total"] == 4.5 + 5.0 + 3.5
+
+
+async def test_merge_matches_by_line_id(client, headers, products):
+    p0, _, _ = products
+    sale = await open_sale(client, headers, [{"product_id": p0, "quantity": 1}])
+    line_id = sale["lines"][0]["id"]
+
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": [
+        {"id": line_id, "product_id": p0, "quantity": 4},
+    ]}, headers=headers)
+    sale = response.json()
+    assert [(line["id"], line["quantity"]) for line in sale["lines"]] == [(line_id, 4)]
+    assert sale["total"] == 6.0
+
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": [
+        {"id": 999999, "product_id": p0, "quantity": 1},
+    ]}, headers=headers)
+    assert response.status_code == 404
+
+
+async def test_merge_keeps_the_ordered_price(client, headers, products):
+    p0, _, _ = products
+    sale = await open_sale(client, headers, [{"product_id": p0, "quantity": 1}])
+    response = await client.put(f"/products/{p0}", json={"price": 9.0}, headers=headers)
+    assert response.status_code == 200, response.text
+
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": [
+        {"product_id": p0, "quantity": 2},
+    ]}, headers=headers)
+    sale = response.json()
+    assert sale["lines"][0]["price_unit"] == 1.5
+    assert sale["total"] == 3.0
+
+
+async def test_merge_removes_leftover_lines(client, headers, products):
+    p0, p1, _ = products
+    sale = await open_sale(client, headers, [{"product_id": p0, "quantity": 1}, {"product_id": p1, "quantity": 1}])
+
+    response = await client.put(f"/sales/{sale['id']}", json={"merge": True, "lines": [
+        {"product_id": p1, "quantity": 1},
+    ]}, headers=headers)
+    sale = response.json()
+    assert [line["product_id"] for line in sale["lines"]] == [p1]
+    assert sale["total"] == 2.5
+
+    stored = (await client.get(f"/sales/{sale['id']}", headers=headers)).json()
+    assert [line["product_id"] for line in stored["lines"]] == [p1]
+    assert stored["total"] == 2.5
@@ -0,0 +1,50 @@
+"""
+POST /sales/open: at most one open account per table.
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.db import engine
+from app.sales.routes import is_open_table_conflict
+
+
+async def create_table(client, headers, name="Mesa 1"):
+    response = await client.post("/tables/", json={"name": name}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def test_second_open_account_on_a_table_is_rejected(client, headers):
+    table_id = await create_table(client, headers)
+    first = await client.post("/sales/open", json={"table_id": table_id}, headers=headers)
+    assert first.status_code == 201, first.text
+
+    second = await client.post("/sales/open", json={"table_id": table_id}, headers=headers)
+    assert second.status_code == 400
+    assert second.json()["detail"] == "La mesa ya tiene una cuenta abierta"
+
+    # Once the account is closed the table can be opened again
+    assert (await client.post(f"/sales/{first.json()['id']}/close", headers=headers)).status_code == 200
+    assert (await client.post("/sales/open", json={"table_id": table_id}, headers=headers)).status_code == 201
+
+
+async def test_unknown_table_is_not_found(client, headers):
+    response = await client.post("/sales/open", json={"table_id": 999999}, headers=headers)
+    assert response.status_code == 404
+
+
+async def integrity_error(*statements) -> IntegrityError:
+    async with engine.connect() as conn:
+        with pytest.raises(IntegrityError) as error:
+            for statement in statements:
+                await conn.execute(text(statement))
+        await conn.rollback()
+    return error.value
+
+
+async def test_only_the_open_table_index_maps_to_a_conflict(client):
+    insert = "INSERT INTO sales (id, total, status, table_id, tenant_id) VALUES ({}, 0, 'OPEN', {}, 't1')"
+    assert is_open_table_conflict(await integrity_error(insert.format(1, 1), insert.format(2, 1)))
+    # Any other constraint is not a second open account
+    assert not is_open_table_conflict(await integrity_error(insert.format(1, 1), insert.format(1, 2)))
@@ -0,0 +1,58 @@
+"""
+Sale lines resolve their products with one query (app/sales/pricing.py).
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.db import engine
+
+from conftest import register
+
+
+@contextmanager
+def product_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM products" in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def test_lines_are_priced_with_a_single_in_query(client, headers, products):
+    p0, p1, p2 = products
+    lines = [
+        {"product_id": p0, "quantity": 2},
+        {"product_id": p1, "quantity": 1},
+        {"product_id": p0, "quantity": 1},
+        {"product_id": p2, "quantity": 3},
+    ]
+    with product_queries() as statements:
+        response = await client.post("/sales/", json={"lines": lines}, headers=headers)
+    assert response.status_code == 201, response.text
+    assert response.json()["total"] == 1.5 * 3 + 2.5 + 3.5 * 3
+    assert len(statements) == 1 and " IN " in statements[0]
+
+
+async def test_every_missing_product_is_listed_in_one_404(client, headers, products):
+    lines = [{"product_id": products[0], "quantity": 1}, {"product_id": 999999, "quantity": 1}]
+    response = await client.post("/sales/", json={"lines": lines}, headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Producto 999999 no encontrado"
+
+    lines += [{"product_id": 999998, "quantity": 1}]
+    response = await client.post("/sales/", json={"lines": lines}, headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Productos 999998, 999999 no encontrados"
+
+    # Another tenant's products are missing too
+    other = await register(client, "other@test.com")
+    response = await client.post("/sales/", json={"lines": lines[:1]}, headers=other)
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Producto {products[0]} no encontrado"
@@ -0,0 +1,201 @@
+"""
+Moving a tenant to a shard and back (app/core/sharding.py).
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.core.models import TenantShard
+from app.core import sharding
+from app.core.sharding import DEFAULT_SHARD, TENANT_TABLES, move_tenant, shard_router
+from app.db import Base, engine
+from app.reports import rebuild
+
+from conftest import PASSWORD, register
+
+
+@pytest.fixture
+async def shard(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(shard_router, "urls", {"s1": f"sqlite+aiosqlite:///{tmp_path}/s1.db"})
+    monkeypatch.setattr(shard_router, "ttl", 0)
+    monkeypatch.setattr(shard_router, "_engines", {})
+    monkeypatch.setattr(shard_router, "_directory", {})
+    target = shard_router.engine("s1")
+    async with target.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield target
+    await shard_router.dispose()
+
+
+async def sell(client, headers, product_id, quantity=1):
+    response = await client.post("/sales/", json={"lines": [{"product_id": product_id, "quantity": quantity}]}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def tenant_of(username):
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT tenant_id FROM users WHERE username = :u"), {"u": username})).scalar()
+
+
+async def snapshot(bind, tenant_id):
+    """The tenant's rows per table, ids included."""
+    rows = {}
+    async with bind.connect() as conn:
+        for model, criteria in TENANT_TABLES:
+            table = model.__table__
+            query = select(table).where(criteria(tenant_id)).order_by(*table.primary_key.columns)
+            rows[table.name] = [tuple(row) for row in (await conn.execute(query)).all()]
+    return rows
+
+
+async def directory(tenant_id):
+    async with engine.connect() as conn:
+        return (await conn.execute(
+            select(TenantShard.shard, TenantShard.moving).where(TenantShard.tenant_id == tenant_id)
+        )).one()
+
+
+def quiet(*args):
+    pass
+
+
+async def test_move_to_a_shard_and_back(client, headers, products, shard):
+    tenant_id = await tenant_of("admin@test.com")
+    await sell(client, headers, products[0], 2)
+    assert (await client.delete("/cash-closing/sales", headers=headers)).status_code == 200
+    await sell(client, headers, products[1])
+    before = await snapshot(engine, tenant_id)
+    assert before["sales"] and before["sales_archive"] and before["products"]
+
+    await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+    assert tuple(await directory(tenant_id)) == ("s1", False)
+    assert await snapshot(shard, tenant_id) == before
+    assert not any((await snapshot(engine, tenant_id)).values())
+
+    # Requests now read and write the shard
+    sale_id = await sell(client, headers, products[2])
+    history = (await client.get("/sales/history", headers=headers)).json()["items"]
+    assert sale_id in [item["id"] for item in history]
+    moved = await snapshot(shard, tenant_id)
+    assert len(moved["sales"]) == len(before["sales"]) + 1
+    assert not any((await snapshot(engine, tenant_id)).values())
+
+    await move_tenant(tenant_id, DEFAULT_SHARD, wait=0, log=quiet)
+    assert tuple(await directory(tenant_id)) == (DEFAULT_SHARD, False)
+    assert await snapshot(engine, tenant_id) == moved
+    assert not any((await snapshot(shard, tenant_id)).values())
+    async with shard.connect() as conn:
+        assert (await conn.execute(text("SELECT COUNT(*) FROM users"))).scalar() == 0
+
+
+async def test_move_back_refuses_ids_taken_meanwhile(client, headers, products, shard):
+    tenant_id = await tenant_of("admin@test.com")
+    await sell(client, headers, products[0])
+    await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+
+    # Both databases hand out the next sale id: one to each tenant
+    other = await register(client, "other@test.com")
+    category = (await client.post("/products/categories/", json={"name": "Food"}, headers=other)).json()
+    product = (await client.post("/products/", json={
+        "name": "Bread", "price": 1.0, "sku": "B1", "category_id": category["id"],
+    }, headers=other)).json()
+    assert await sell(client, other, product["id"]) == await sell(client, headers, products[0])
+    in_shard = await snapshot(shard, tenant_id)
+
+    with pytest.raises(ValueError, match="sales"):
+        await move_tenant(tenant_id, DEFAULT_SHARD, wait=0, log=quiet)
+    assert tuple(await directory(tenant_id)) == ("s1", False)
+    assert await snapshot(shard, tenant_id) == in_shard
+
+
+async def test_failed_switch_keeps_the_old_copy(client, headers, products, shard, monkeypatch):
+    tenant_id = await tenant_of("admin@test.com")
+    await sell(client, headers, products[0])
+    before = await snapshot(engine, tenant_id)
+    set_directory = sharding.set_directory
+
+    async def failing_switch(tenant_id, shard, moving):
+        if shard == "s1":
+            raise RuntimeError("main database unavailable")
+        await set_directory(tenant_id, shard, moving)
+
+    monkeypatch.setattr(sharding, "set_directory", failing_switch)
+    with pytest.raises(RuntimeError):
+        await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+    assert tuple(await directory(tenant_id)) == (DEFAULT_SHARD, False)
+    assert await snapshot(engine, tenant_id) == before
+    assert not any((await snapshot(shard, tenant_id)).values())
+
+
+async def test_error_after_the_switch_keeps_the_new_copy(client, headers, products, shard, monkeypatch):
+    tenant_id = await tenant_of("admin@test.com")
+    await sell(client, headers, products[0])
+    before = await snapshot(engine, tenant_id)
+    set_directory = sharding.set_directory
+
+    async def switch_then_fail(tenant_id, shard, moving):
+        await set_directory(tenant_id, shard, moving)
+        if shard == "s1":
+            raise RuntimeError("connection lost after commit")
+
+    monkeypatch.setattr(sharding, "set_directory", switch_then_fail)
+    with pytest.raises(RuntimeError):
+        await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+    assert tuple(await directory(tenant_id)) == ("s1", False)
+    assert await snapshot(shard, tenant_id) == before
+    assert not any((await snapshot(engine, tenant_id)).values())
+
+
+async def users_in(bind, tenant_id):
+    async with bind.connect() as conn:
+        return dict((await conn.execute(
+            text("SELECT username, hashed_password FROM users WHERE tenant_id = :t"), {"t": tenant_id}
+        )).all())
+
+
+async def login(client, username):
+    data = {"username": username, "password": PASSWORD}
+    token = (await client.post("/auth/login", json=data)).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_deleting_a_user_updates_the_shard(client, headers, products, shard):
+    tenant_id = await tenant_of("admin@test.com")
+    await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+    created = await client.post("/auth/create_user", json={"username": "cashier@test.com", "password": PASSWORD}, headers=headers)
+    cashier = created.json()
+    sale_id = await sell(client, await login(client, "cashier@test.com"), products[0])
+
+    assert (await client.delete(f"/auth/{cashier['id']}")).status_code == 401
+    assert (await client.delete(f"/auth/{cashier['id']}", headers=headers)).status_code == 204
+    assert "cashier@test.com" not in await users_in(engine, tenant_id)
+    assert "cashier@test.com" not in await users_in(shard, tenant_id)
+    async with shard.connect() as conn:
+        user_id = (await conn.execute(text("SELECT user_id FROM sales WHERE id = :id"), {"id": sale_id})).scalar()
+    assert user_id is None
+
+
+async def test_login_rehash_updates_the_shard(client, headers, shard, monkeypatch):
+    tenant_id = await tenant_of("admin@test.com")
+    await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+    before = (await users_in(shard, tenant_id))["admin@test.com"]
+
+    monkeypatch.setattr("app.auth.routes.needs_rehash", lambda hashed_password: True)
+    await login(client, "admin@test.com")
+    rehashed = (await users_in(engine, tenant_id))["admin@test.com"]
+    assert rehashed != before
+    assert (await users_in(shard, tenant_id))["admin@test.com"] == rehashed
+
+
+async def test_rebuild_covers_every_shard(client, headers, products, shard):
+    tenant_id = await tenant_of("admin@test.com")
+    await sell(client, headers, products[0], 3)
+    await move_tenant(tenant_id, "s1", wait=0, log=quiet)
+    rollups = (await snapshot(shard, tenant_id))["sales_rollups"]
+    assert rollups
+    async with shard.begin() as conn:
+        await conn.execute(text("DELETE FROM sales_rollups"))
+
+    await rebuild.main(None)
+    assert (await snapshot(shard, tenant_id))["sales_rollups"] == rollups